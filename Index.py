@@ -1,13 +1,15 @@
 import tkinter as tk
 from tkinter import messagebox
-from humedal_cienegas_lerma_sim import SimulacionCienegas
-import subprocess  # Importamos subprocess para ejecutar otros scripts
+from sesion import SesionDatos
+
+# Los módulos de simulación (geopandas, matplotlib, contextily...) se importan al pulsar cada botón,
+# para que el menú aparezca de inmediato
 
 class AplicacionSimulaciones:
     def __init__(self, master):
         self.master = master
         master.title("Simulaciones de las Ciénegas de Lerma")
-        master.geometry("450x300")  # Aumentamos un poco el ancho de la ventana
+        master.geometry("450x370")  # Aumentamos un poco el ancho de la ventana
 
         button_style = {'font': ('Arial', 12), 'width': 30, 'height': 2, 'bg': '#4CAF50', 'fg': 'white'}
 
@@ -20,26 +22,44 @@ class AplicacionSimulaciones:
         self.btn_pendiente = tk.Button(master, text="Microplásticos en el Tiempo", command=self.simulacion_pendiente, **button_style)
         self.btn_pendiente.pack(pady=10)
 
+        self.btn_transporte = tk.Button(master, text="Transporte de Microplásticos", command=self.simulacion_transporte, **button_style)
+        self.btn_transporte.pack(pady=10)
+
         self.btn_salir = tk.Button(master, text="Salir", command=self.salir, **button_style)
         self.btn_salir.pack(pady=10)
 
-        self.simulacion = SimulacionCienegas()
+        self.sesion = SesionDatos()  # Capas cargadas una vez y compartidas por todas las ventanas
+        self.simulacion = None
 
     def simulacion_reduccion(self):
+        from humedal_cienegas_lerma_sim import SimulacionCienegas
+        if self.simulacion is None:
+            self.simulacion = SimulacionCienegas(self.sesion)
         self.simulacion.ejecutar_simulacion_reduccion()
 
     def simulacion_microplasticos(self):
         try:
-            subprocess.run(["python", "microplasticos.py"], check=True)  # Ejecuta microplasticos.py
-        except subprocess.CalledProcessError as e:
+            from microplasticos import SimulacionMicroplasticos
+            # Se abre como una ventana más de esta aplicación, sin lanzar otro intérprete
+            SimulacionMicroplasticos(self.master, self.sesion).ejecutar_simulacion()
+        except Exception as e:
             messagebox.showerror("Error", f"Error al ejecutar la simulación de microplásticos:\n{e}")
 
     def simulacion_pendiente(self):
         try:
-            subprocess.run(["python", "MicroplasticosTiempo.py"], check=True)  # Ejecuta Microplasticos tiempo.py
-        except subprocess.CalledProcessError as e:
+            from MicroplasticosTiempo import SimulacionMicroplasticosTiempo
+            SimulacionMicroplasticosTiempo(self.master, self.sesion).iniciar_simulacion()
+        except Exception as e:
             messagebox.showerror("Error", f"Error al ejecutar la simulación de microplásticos en el tiempo:\n{e}")
 
+    def simulacion_transporte(self):
+        # La misma ventana año por año, con el modelo de advección-difusión en malla
+        try:
+            from MicroplasticosTiempo import SimulacionMicroplasticosTiempo
+            SimulacionMicroplasticosTiempo(self.master, self.sesion, modelo='transporte').iniciar_simulacion()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al ejecutar la simulación de transporte de microplásticos:\n{e}")
+
     def salir(self):
         self.master.quit()
         self.master.destroy()
@@ -1,53 +1,72 @@
-import geopandas as gpd
-import pandas as pd
 import matplotlib.pyplot as plt
-import contextily as cx
 from matplotlib_scalebar.scalebar import ScaleBar
-import numpy as np
-import random
-from shapely.geometry import Point
+import argparse
+import queue
+import threading
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 from tkinter import messagebox
+from capas import RUTAS_INDUSTRIAS, RUTA_CARRETERAS, RUTA_CIENEGAS, cargar_industrias, cargar_carreteras, cargar_cienegas
+from almacen_puntos import AlmacenPuntos, contar_puntos
+from nivel_detalle import CacheNivelesDetalle, CapaNivelDetalle
+from mapa_base import FUENTE_OSM, dibujar_mapa_base
+from motor_simulacion import MotorMicroplasticos
+from sesion import SesionDatos
+import instrumentacion
+from transporte import MARGEN_TRANSPORTE, MotorTransporte
 
 class SimulacionMicroplasticosTiempo:
-    def __init__(self, master):
+    def __init__(self, master, sesion=None, modelo='puntos'):
         self.master = master
-        self.ruta_industrias = {
-            'Lerma_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Apoyo\ApoyoLerma.shp",
-            'Lerma_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Constructoras\ConstructorasLerma.shp",
-            'Lerma_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Manufactureras\ManufaLerma.shp",
-            'Lerma_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Transporte\TransporteLerma.shp",
-            'Ocoyoacac_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Apoyo\ApoyoOco.shp",
-            'Ocoyoacac_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Constructoras\ConstructorasOco.shp",
-            'Ocoyoacac_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Manufactureras\ManuOco.shp",
-            'Ocoyoacac_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Transporte\TransporteOco.shp",
-            'SanMateo_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Apoyo\ApoyoSanMateo.shp",
-            'SanMateo_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Constructoras\ConstructorasSanMateo.shp",
-            'SanMateo_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Manufactureras\ManuSanMateo.shp",
-            'SanMateo_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Transporte\TransporteSanMateo.shp",
-        }
-        self.ruta_carreteras = r"C:\Users\Pablo\Downloads\ShapeIndustrias\CallesCienegas\CallesCienegas.shp"
-        self.ruta_cienegas = r"C:\Users\Pablo\Downloads\Shapesxd\ShapeCienegas.shp"
+        self.sesion = sesion if sesion is not None else SesionDatos()  # Capas compartidas con las demás ventanas
+        self.ruta_industrias = dict(RUTAS_INDUSTRIAS)
+        self.ruta_carreteras = RUTA_CARRETERAS
+        self.ruta_cienegas = RUTA_CIENEGAS
 
         self.ventana_grafico = tk.Toplevel(self.master)  # Creamos una nueva ventana secundaria
         self.ventana_grafico.title("Simulación de Microplásticos en las Ciénegas de Lerma")
         self.ventana_grafico.geometry("800x700")
         self.fig = None
         self.ax = None
+        self.canvas = None
+        self.colecciones = {}  # año -> colección de puntos persistente
+        self.fondo_estatico = None  # Imagen de las capas que no cambian entre años
+        self.fondos_por_ano = {}  # año -> imagen con los puntos acumulados hasta ese año
         self.ano_actual = 2023
-        self.puntos_por_ano = {}
+        self.puntos_por_ano = AlmacenPuntos()  # Arreglos x, y, año y fuente de todos los años
+        self.motor = None
+        self.fuente_mapa_base = FUENTE_OSM  # FUENTE_LOCAL usa MapaCienegas.tif y funciona sin red
+        self.modo_distancias = 'exacto'  # 'exacto' (índice espacial) o 'raster' (campos precalculados)
+        self.resolucion_campos = 50  # Tamaño de celda en metros del modo 'raster'
+        self.modelo = modelo  # 'puntos' (muestreo por influencia) o 'transporte' (advección-difusión en malla)
+        self.resolucion_transporte = 100  # Tamaño de celda en metros del modelo de transporte
+        self.transporte = None
+        self.campos_por_ano = {}  # año -> depósito acumulado del modelo de transporte
+        self.precalculando = False
+        self.ano_pendiente = None  # Año pedido que todavía calcula el hilo de fondo
+        self.total_precalculo = 0
+        self.evento_cancelar = threading.Event()
+        self.cola_precalculo = queue.Queue()
+        self.id_revision = None  # Revisión periódica de la cola programada con after()
         self.colores = ['red', 'black', 'green', 'blue', 'purple', 'orange', 'yellow']  # Colores para cada año
 
-        self.ventana_grafico.protocol("WM_DELETE_WINDOW", self.salir)
-
-        self.iniciar_simulacion()
+        self.ventana_grafico.protocol("WM_DELETE_WINDOW", self.volver_al_menu)
 
+    @instrumentacion.medido('carga')
     def cargar_shapefiles(self):
-        # Cargar las industrias
+        # Cargar las ciénegas (primero, porque su extensión acota la lectura de las demás capas)
         try:
-            industrias = [gpd.read_file(shp).to_crs(epsg=3857) for shp in self.ruta_industrias.values()]
-            gdf_industrias = gpd.GeoDataFrame(pd.concat(industrias, ignore_index=True))
+            gdf_cienegas = self.sesion.obtener(('cienegas', self.ruta_cienegas), lambda: cargar_cienegas(self.ruta_cienegas))
+            print("Shapefiles de ciénegas cargados correctamente.")
+        except Exception as e:
+            print(f"Error al cargar ciénegas: {e}")
+            messagebox.showerror("Error", f"Error al cargar ciénegas: {e}")
+            return None, None, None
+
+        # Cargar las industrias dentro del radio de influencia (en paralelo y desde la caché si no cambiaron)
+        try:
+            gdf_industrias = self.sesion.obtener(('industrias', tuple(self.ruta_industrias.values())),
+                                                 lambda: cargar_industrias(self.ruta_industrias, gdf_cienegas=gdf_cienegas))
             print("Shapefiles de industrias cargados correctamente.")
         except Exception as e:
             print(f"Error al cargar industrias: {e}")
@@ -56,100 +75,141 @@ class SimulacionMicroplasticosTiempo:
 
         # Cargar las carreteras
         try:
-            gdf_carreteras = gpd.read_file(self.ruta_carreteras).to_crs(epsg=3857)
+            gdf_carreteras = self.sesion.obtener(('carreteras', self.ruta_carreteras),
+                                                 lambda: cargar_carreteras(self.ruta_carreteras, gdf_cienegas=gdf_cienegas))
             print("Shapefiles de carreteras cargados correctamente.")
         except Exception as e:
             print(f"Error al cargar carreteras: {e}")
             messagebox.showerror("Error", f"Error al cargar carreteras: {e}")
             return None, None, None
 
-        # Cargar las ciénegas
-        try:
-            gdf_cienegas = gpd.read_file(self.ruta_cienegas).to_crs(epsg=3857)
-            print("Shapefiles de ciénegas cargados correctamente.")
-        except Exception as e:
-            print(f"Error al cargar ciénegas: {e}")
-            messagebox.showerror("Error", f"Error al cargar ciénegas: {e}")
-            return None, None, None
-
         return gdf_industrias, gdf_carreteras, gdf_cienegas
 
-    def dispersar_microplasticos(self, gdf_cienegas, gdf_industrias, gdf_carreteras, ano, num_puntos_inicial=1000):
-        if gdf_cienegas is None or gdf_industrias is None or gdf_carreteras is None:
-            return []
-
-        # Crear una lista para almacenar los puntos de microplásticos
-        puntos_microplasticos = []
-
-        # Parámetros de simulación
-        tasa_incremento = 1.1  # Tasa de incremento anual de microplásticos
-
-        # Añadir puntos de microplásticos para el año actual
-        for idx, row in gdf_cienegas.iterrows():
-            poligono = row['geometry']
-
-            # Añadir puntos de microplásticos
-            for _ in range(int(num_puntos_inicial * tasa_incremento ** (ano - 2023))):
-                # Generar un punto dentro del polígono
-                minx, miny, maxx, maxy = poligono.bounds
-                while True:
-                    punto = Point(random.uniform(minx, maxx), random.uniform(miny, maxy))
-                    if poligono.contains(punto):
-                        break
-
-                # Evaluar la influencia de las industrias y carreteras
-                dist_industrias = gdf_industrias.distance(punto).min()
-                dist_carreteras = gdf_carreteras.distance(punto).min()
+    def obtener_niveles(self, gdf_cienegas):
+        # Compartidos por sesión: las versiones simplificadas se calculan una vez por capa
+        return self.sesion.obtener(('niveles', id(gdf_cienegas)), lambda: CacheNivelesDetalle(gdf_cienegas.geometry))
+
+    def obtener_motor(self, gdf_cienegas, gdf_industrias, gdf_carreteras):
+        # El motor (sin interfaz gráfica) conserva los índices espaciales para todos los años
+        if self.motor is None:
+            # Compartido por sesión: la otra simulación de microplásticos reutiliza sus índices espaciales
+            clave = ('motor', id(gdf_cienegas), id(gdf_industrias), id(gdf_carreteras), self.modo_distancias, self.resolucion_campos)
+            self.motor = self.sesion.obtener(clave, lambda: MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras,
+                                                                                self.modo_distancias, self.resolucion_campos))
+        return self.motor
+
+    def obtener_transporte(self):
+        if self.transporte is None:
+            # Las fuentes se recortan con el margen de la malla: las cargadas para el modelo de puntos
+            # solo llegan hasta su umbral de influencia (2 km en carreteras)
+            gdf_industrias = self.sesion.obtener(('industrias', tuple(self.ruta_industrias.values()), MARGEN_TRANSPORTE),
+                                                 lambda: cargar_industrias(self.ruta_industrias, gdf_cienegas=self.gdf_cienegas,
+                                                                           margen=MARGEN_TRANSPORTE))
+            gdf_carreteras = self.sesion.obtener(('carreteras', self.ruta_carreteras, MARGEN_TRANSPORTE),
+                                                 lambda: cargar_carreteras(self.ruta_carreteras, gdf_cienegas=self.gdf_cienegas,
+                                                                           margen=MARGEN_TRANSPORTE))
+            self.transporte = MotorTransporte(self.gdf_cienegas, gdf_industrias, gdf_carreteras,
+                                              resolucion=self.resolucion_transporte, margen=MARGEN_TRANSPORTE)
+        return self.transporte
+
+    def ano_calculado(self, ano):
+        if self.modelo == 'transporte':
+            return ano in self.campos_por_ano
+        return ano in self.puntos_por_ano
+
+    @instrumentacion.medido('calculo_ano')
+    def calcular_ano(self, ano):
+        # Modelo de transporte: avanza la malla año por año (el estado se arrastra entre años)
+        if self.modelo == 'transporte':
+            return self.obtener_transporte().simular_hasta(ano)
+        # La regla del año base vive en el motor, la misma que usa simular.py tiempo
+        motor = self.obtener_motor(self.gdf_cienegas, self.gdf_industrias, self.gdf_carreteras)
+        x_vals, y_vals, fuente = motor.simular_ano(ano)
+        print(f"Año {ano}: {contar_puntos(fuente)} puntos generados.")
+        return x_vals, y_vals, fuente
+
+    def guardar_ano(self, ano, resultado):
+        if self.ano_calculado(ano):
+            return
+        if self.modelo == 'transporte':
+            self.campos_por_ano[ano] = resultado
+        else:
+            self.puntos_por_ano.agregar(ano, *resultado)
+
+    def preparar_mapa(self):
+        frame_grafico = tk.Frame(self.ventana_grafico)
+        frame_grafico.pack(fill=tk.BOTH, expand=True)
+
+        self.fig, self.ax = plt.subplots(figsize=(8, 6))
+        self.canvas = FigureCanvasTkAgg(self.fig, master=frame_grafico)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.dibujar_capas_estaticas()
+
+    def dibujar_capas_estaticas(self):
+        # Solo usa self.fig, self.ax y self.canvas: los benchmarks lo llaman sobre un lienzo Agg, sin Tk
+        # Capas estáticas: se dibujan una sola vez y quedan en la imagen de fondo
+        # Al cambiar de nivel por zoom se redibuja todo y al_redibujar vuelve a copiar el fondo
+        self.capa_cienegas = CapaNivelDetalle(self.ax, self.obtener_niveles(self.gdf_cienegas),
+                                              facecolor='none', edgecolor='blue', linewidth=2)
+        dibujar_mapa_base(self.ax, zoom=12, fuente=self.fuente_mapa_base)
+        self.ax.add_artist(ScaleBar(1, units="m", location="lower right"))
 
-                # Incrementar la cantidad de microplásticos según la proximidad
-                if dist_industrias < 5000:  # 5 km de influencia industrial
-                    puntos_microplasticos.append(punto)
-                if dist_carreteras < 2000:  # 2 km de influencia de carreteras
-                    puntos_microplasticos.append(punto)
+        # Los artistas animados no se pintan en el dibujo completo, solo mediante blitting
+        self.texto_ano = self.ax.text(0.05, 0.95, "", transform=self.ax.transAxes, animated=True,
+                                      fontsize=14, verticalalignment='top', bbox=dict(facecolor='white', alpha=0.5))
+
+        self.fig.tight_layout()
+        self.canvas.mpl_connect('draw_event', self.al_redibujar)
+        self.canvas.draw()
+
+    def al_redibujar(self, evento):
+        # Un dibujo completo (p. ej. al redimensionar) invalida las imágenes guardadas
+        self.fondo_estatico = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.fondos_por_ano = {}
+        self.componer_mapa()
+
+    def coleccion_ano(self, ano):
+        # Una colección persistente por año; se crea la primera vez que se muestra
+        if ano not in self.colecciones and self.modelo == 'transporte':
+            self.colecciones[ano] = self.obtener_transporte().dibujar(self.ax, self.campos_por_ano[ano], animated=True)
+        if ano not in self.colecciones:
+            puntos = self.puntos_por_ano.del_ano(ano)
+            color = self.colores[(ano - 2023) % len(self.colores)]
+            self.colecciones[ano] = self.ax.scatter(puntos['x'], puntos['y'], color=color, s=1,
+                                                    label=f'Microplásticos {ano}', animated=True)
+        return self.colecciones[ano]
+
+    def fondo_hasta(self, ano):
+        # Imagen con las capas estáticas y los puntos de 2023 hasta 'ano'; cada año solo pinta sus puntos nuevos
+        if ano < 2023:
+            return self.fondo_estatico
+        if ano in self.fondos_por_ano:
+            return self.fondos_por_ano[ano]
+
+        # El depósito del modelo de transporte ya es acumulado: se pinta sobre las capas estáticas
+        anterior = self.fondo_estatico if self.modelo == 'transporte' else self.fondo_hasta(ano - 1)
+        self.canvas.restore_region(anterior)
+        if not self.ano_calculado(ano):
+            return self.canvas.copy_from_bbox(self.ax.bbox)  # Año aún sin calcular: no se guarda
+        self.ax.draw_artist(self.coleccion_ano(ano))
+        self.fondos_por_ano[ano] = self.canvas.copy_from_bbox(self.ax.bbox)
+        return self.fondos_por_ano[ano]
+
+    def componer_mapa(self):
+        self.canvas.restore_region(self.fondo_hasta(self.ano_actual))
 
-        print(f"Año {ano}: {len(puntos_microplasticos)} puntos generados.")
-        return puntos_microplasticos
+        # Mostrar el año actual en el mapa
+        self.texto_ano.set_text(f"Año: {self.ano_actual}")
+        self.ax.draw_artist(self.texto_ano)
+        self.canvas.blit(self.ax.bbox)
 
+    @instrumentacion.medido('dibujo')
     def mostrar_mapa(self):
         if self.ax is None:  # Crear gráfico solo la primera vez
-            frame_grafico = tk.Frame(self.ventana_grafico)
-            frame_grafico.pack(fill=tk.BOTH, expand=True)
-
-            self.fig, self.ax = plt.subplots(figsize=(8, 6))
-            canvas = FigureCanvasTkAgg(self.fig, master=frame_grafico)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-            # Mostrar las ciénegas
-            self.gdf_cienegas.plot(ax=self.ax, facecolor='none', edgecolor='blue', linewidth=2)
-
-            # Añadir mapa base
-            cx.add_basemap(self.ax, source=cx.providers.OpenStreetMap.Mapnik, zoom=12)
-
-            # Añadir barra de escala
-            scalebar = ScaleBar(1, units="m", location="lower right")
-            self.ax.add_artist(scalebar)
-
-        # Limpiar el eje antes de volver a dibujar
-        self.ax.clear()
-        self.gdf_cienegas.plot(ax=self.ax, facecolor='none', edgecolor='blue', linewidth=2)
-        cx.add_basemap(self.ax, source=cx.providers.OpenStreetMap.Mapnik, zoom=12)
-        self.ax.add_artist(ScaleBar(1, units="m", location="lower right"))
-
-        # Dibujar los puntos de microplásticos por año hasta el año actual
-        for ano in range(2023, self.ano_actual + 1):
-            if ano in self.puntos_por_ano:
-                puntos = self.puntos_por_ano[ano]
-                x_vals = [punto.x for punto in puntos]
-                y_vals = [punto.y for punto in puntos]
-                color = self.colores[(ano - 2023) % len(self.colores)]
-                self.ax.scatter(x_vals, y_vals, color=color, s=1, label=f'Microplásticos {ano}')
-
-        # Mostrar el año actual en el mapa
-        self.ax.text(0.05, 0.95, f"Año: {self.ano_actual}", transform=self.ax.transAxes,
-                     fontsize=14, verticalalignment='top', bbox=dict(facecolor='white', alpha=0.5))
+            self.preparar_mapa()  # El evento de dibujo compone el primer año
+            return
 
-        plt.tight_layout()
+        self.componer_mapa()
 
     def siguiente_ano(self):
         if self.ano_actual >= 2027:
@@ -157,19 +217,99 @@ class SimulacionMicroplasticosTiempo:
             return
 
         self.ano_actual += 1
-        if self.ano_actual not in self.puntos_por_ano:
-            nuevos_puntos = self.dispersar_microplasticos(self.gdf_cienegas, self.gdf_industrias, self.gdf_carreteras, self.ano_actual)
-            self.puntos_por_ano[self.ano_actual] = nuevos_puntos
+        if not self.ano_calculado(self.ano_actual) and self.precalculando:
+            # El año se está calculando en segundo plano: se mostrará en cuanto llegue
+            self.ano_pendiente = self.ano_actual
+            self.btn_siguiente_ano.config(state=tk.DISABLED)
+            self.etiqueta_progreso.config(text=f"Calculando el año {self.ano_actual}...")
+            return
+
+        if not self.ano_calculado(self.ano_actual):
+            self.guardar_ano(self.ano_actual, self.calcular_ano(self.ano_actual))
 
         self.mostrar_mapa()
         self.actualizar_botones()
 
     def ano_anterior(self):
+        if self.ano_pendiente is not None:
+            # Se deja de esperar el año pendiente y se vuelve al que está en pantalla
+            self.ano_pendiente = None
+            self.btn_siguiente_ano.config(state=tk.NORMAL)
         if self.ano_actual > 2023:
             self.ano_actual -= 1
             self.mostrar_mapa()
             self.actualizar_botones()
 
+    def iniciar_precalculo(self):
+        anos = [ano for ano in range(2024, 2028) if not self.ano_calculado(ano)]
+        if not anos:
+            return
+        self.precalculando = True
+        self.total_precalculo = len(anos)
+        self.evento_cancelar.clear()
+        self.etiqueta_progreso.config(text=f"Precalculando años: 0/{self.total_precalculo}")
+        self.btn_cancelar.pack(side=tk.LEFT, padx=5)
+        threading.Thread(target=self.precalcular, args=(anos,), daemon=True).start()
+        self.id_revision = self.ventana_grafico.after(100, self.revisar_precalculo)
+
+    def precalcular(self, anos):
+        # Corre fuera del hilo de Tk: no toca widgets, solo deja los resultados en la cola
+        for ano in anos:
+            if self.evento_cancelar.is_set():
+                break
+            try:
+                resultado = self.calcular_ano(ano)
+            except Exception as e:
+                self.cola_precalculo.put((ano, e))
+                break
+            self.cola_precalculo.put((ano, resultado))
+        self.cola_precalculo.put((None, None))  # Fin del precálculo
+
+    def revisar_precalculo(self):
+        # Recoge en el hilo de Tk los años que terminó el hilo de fondo
+        while True:
+            try:
+                ano, resultado = self.cola_precalculo.get_nowait()
+            except queue.Empty:
+                break
+
+            if ano is None:
+                self.terminar_precalculo()
+                return
+            if isinstance(resultado, Exception):
+                print(f"Error al precalcular el año {ano}: {resultado}")
+                continue
+
+            self.guardar_ano(ano, resultado)
+            listos = sum(1 for a in range(2024, 2028) if self.ano_calculado(a))
+            self.etiqueta_progreso.config(text=f"Precalculando años: {listos}/{self.total_precalculo}")
+            if ano == self.ano_pendiente:
+                self.mostrar_ano_pendiente()
+
+        self.id_revision = self.ventana_grafico.after(100, self.revisar_precalculo)
+
+    def terminar_precalculo(self):
+        self.precalculando = False
+        self.btn_cancelar.pack_forget()
+        cancelado = self.evento_cancelar.is_set()
+        self.etiqueta_progreso.config(text="Precálculo cancelado" if cancelado else "Años precalculados")
+
+        # Si se esperaba un año que no llegó a calcularse, se calcula ahora
+        if self.ano_pendiente is not None:
+            if not self.ano_calculado(self.ano_pendiente):
+                self.guardar_ano(self.ano_pendiente, self.calcular_ano(self.ano_pendiente))
+            self.mostrar_ano_pendiente()
+
+    def mostrar_ano_pendiente(self):
+        self.ano_pendiente = None
+        self.btn_siguiente_ano.config(state=tk.NORMAL)
+        self.mostrar_mapa()
+        self.actualizar_botones()
+
+    def cancelar_precalculo(self):
+        self.evento_cancelar.set()
+        self.etiqueta_progreso.config(text="Cancelando precálculo...")
+
     def actualizar_botones(self):
         # Mostrar/ocultar botones dependiendo del año actual
         if self.ano_actual > 2023:
@@ -187,8 +327,7 @@ class SimulacionMicroplasticosTiempo:
         if self.gdf_industrias is None or self.gdf_carreteras is None or self.gdf_cienegas is None:
             return
 
-        # Generar los puntos originales para 2023 como en microplasticos.py
-        self.puntos_por_ano[2023] = self.dispersar_microplasticos(self.gdf_cienegas, self.gdf_industrias, self.gdf_carreteras, 2023, num_puntos_inicial=10000)
+        self.guardar_ano(2023, self.calcular_ano(2023))
         self.mostrar_mapa()
 
         frame_botones = tk.Frame(self.ventana_grafico)
@@ -203,12 +342,36 @@ class SimulacionMicroplasticosTiempo:
         btn_salir = tk.Button(frame_botones, text="Salir", command=self.salir)
         btn_salir.pack(side=tk.RIGHT, padx=5)
 
+        self.etiqueta_progreso = tk.Label(frame_botones, text="")
+        self.etiqueta_progreso.pack(side=tk.LEFT, padx=5)
+        self.btn_cancelar = tk.Button(frame_botones, text="Cancelar precálculo", command=self.cancelar_precalculo)
+
+        # Los años siguientes se calculan en segundo plano mientras se explora 2023
+        self.iniciar_precalculo()
+
+    def volver_al_menu(self):
+        # Solo se cierra esta ventana; el menú y las capas de la sesión siguen cargados
+        self.evento_cancelar.set()
+        if self.id_revision is not None:
+            self.ventana_grafico.after_cancel(self.id_revision)
+        self.ventana_grafico.destroy()
+        if self.fig:
+            plt.close(self.fig)
+        if self.master.state() == 'withdrawn':  # Ejecutado por separado: no hay menú al que volver
+            self.master.quit()
+
     def salir(self):
+        self.evento_cancelar.set()
         self.master.quit()  # Cierra toda la aplicación, incluyendo la ventana principal (index.py)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microplásticos en el tiempo en las Ciénegas de Lerma")
+    parser.add_argument('--modelo', choices=['puntos', 'transporte'], default='puntos',
+                        help="Muestreo de puntos por influencia o transporte por advección-difusión en malla")
+    args = parser.parse_args()
     root = tk.Tk()
     root.withdraw()  # Oculta la ventana principal para que no aparezca
-    simulacion = SimulacionMicroplasticosTiempo(root)
+    simulacion = SimulacionMicroplasticosTiempo(root, modelo=args.modelo)
+    simulacion.iniciar_simulacion()
     root.mainloop()
 
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Banderas de fuente: un punto cercano a ambas fuentes se guarda una sola vez con las dos banderas
+FUENTE_INDUSTRIA = 1
+FUENTE_CARRETERA = 2
+
+TIPO_PUNTO = np.dtype([('x', 'f8'), ('y', 'f8'), ('ano', 'i2'), ('fuente', 'u1')])
+TAM_BLOQUE = 1 << 16  # El almacén crece de a bloques de este tamaño como mínimo
+
+
+def banderas_fuente(cerca_industrias, cerca_carreteras):
+    return (np.asarray(cerca_industrias, dtype=np.uint8) * FUENTE_INDUSTRIA
+            | np.asarray(cerca_carreteras, dtype=np.uint8) * FUENTE_CARRETERA)
+
+
+def contar_puntos(fuente):
+    # Cuenta como el modelo original: un punto suma una vez por cada fuente cercana
+    return int(np.count_nonzero(fuente & FUENTE_INDUSTRIA) + np.count_nonzero(fuente & FUENTE_CARRETERA))
+
+
+def pesos_fuente(fuente):
+    # Un punto cercano a industria y carretera pesa 2, como en el conteo original
+    return ((fuente & FUENTE_INDUSTRIA) > 0).astype(np.float64) + ((fuente & FUENTE_CARRETERA) > 0)
+
+
+class AlmacenPuntos:
+    def __init__(self, capacidad=TAM_BLOQUE):
+        self._datos = np.empty(capacidad, dtype=TIPO_PUNTO)
+        self._n = 0
+        self._rangos = {}  # año -> lista de (inicio, fin) dentro de _datos
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, ano):
+        return ano in self._rangos
+
+    @property
+    def datos(self):
+        return self._datos[:self._n]
+
+    @property
+    def anos(self):
+        return sorted(self._rangos)
+
+    def _reservar(self, cantidad):
+        necesaria = self._n + cantidad
+        if necesaria <= len(self._datos):
+            return
+        # Crecimiento geométrico por bloques: pocas copias aunque se agreguen muchos años
+        nueva = max(necesaria, 2 * len(self._datos), TAM_BLOQUE)
+        datos = np.empty(nueva, dtype=TIPO_PUNTO)
+        datos[:self._n] = self._datos[:self._n]
+        self._datos = datos
+
+    def agregar(self, ano, x, y, fuente):
+        cantidad = len(x)
+        self._reservar(cantidad)
+        inicio, fin = self._n, self._n + cantidad
+        bloque = self._datos[inicio:fin]
+        bloque['x'] = x
+        bloque['y'] = y
+        bloque['ano'] = ano
+        bloque['fuente'] = fuente
+        self._n = fin
+        self._rangos.setdefault(ano, []).append((inicio, fin))
+
+    def del_ano(self, ano):
+        rangos = self._rangos.get(ano, [])
+        if len(rangos) == 1:
+            inicio, fin = rangos[0]
+            return self._datos[inicio:fin]  # Vista, sin copia
+        if not rangos:
+            return self._datos[:0]
+        return np.concatenate([self._datos[inicio:fin] for inicio, fin in rangos])
+
+    def hasta_ano(self, ano):
+        datos = self.datos
+        return datos[datos['ano'] <= ano]
+
+    def conteo(self, datos=None):
+        datos = self.datos if datos is None else datos
+        return contar_puntos(datos['fuente'])
+
+    def conteo_por_ano(self):
+        return {ano: self.conteo(self.del_ano(ano)) for ano in self.anos}
@@ -0,0 +1,171 @@
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib_scalebar.scalebar import ScaleBar
+from PIL import Image
+
+from mapa_base import FUENTE_OSM, obtener_fondo
+
+# Renderiza las animaciones sin ventana: cada fotograma en un proceso con Agg y después se arma el video.
+# Se usa Figure + FigureCanvasAgg en lugar de pyplot, así no se cambia el backend de las ventanas de Tk.
+
+COLORES_ANOS = ['red', 'black', 'green', 'blue', 'purple', 'orange', 'yellow']  # Como MicroplasticosTiempo.py
+PATRON_FOTOGRAMA = "fotograma_%04d.png"
+
+_escena = None  # Datos compartidos de cada proceso trabajador: fondo, contorno y puntos
+_puntos = None
+
+
+def _iniciar_trabajador(escena, puntos):
+    global _escena, _puntos
+    _escena = escena
+    _puntos = puntos
+
+
+def _figura():
+    fig = Figure(figsize=_escena['tamano'], dpi=_escena['dpi'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    xmin, xmax, ymin, ymax = _escena['limites']
+    if _escena['fondo'] is not None:
+        img, extension = _escena['fondo']
+        ax.imshow(img, extent=extension, zorder=0, interpolation='bilinear')
+    _escena['contorno'].plot(ax=ax, **_escena['estilo_contorno'])
+    ax.add_artist(ScaleBar(dx=1, units="m", location="lower right"))
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+    ax.set_axis_off()
+    return fig, ax
+
+
+def _guardar(fig, ruta):
+    fig.tight_layout()
+    fig.savefig(ruta)
+    return ruta
+
+
+def _dibujar_reduccion(ano, geometrias, porcentaje, ruta):
+    fig, ax = _figura()
+    if len(geometrias):
+        gpd.GeoSeries(geometrias).plot(ax=ax, facecolor='blue', alpha=0.5)
+        ax.set_title(f"Año: {ano}\nReducción: {porcentaje:.2f}%", fontsize=10)
+    else:
+        ax.set_title(f"Año: {ano}\nTodas las geometrías se han reducido a cero.", fontsize=10)
+    return _guardar(fig, ruta)
+
+
+def _fotograma_reduccion(tarea):
+    return _dibujar_reduccion(*tarea)
+
+
+def _fotograma_reduccion_raster(tarea):
+    # El trabajador vectoriza la máscara de su año: la parte costosa del backend raster también va en paralelo
+    from reduccion_raster import poligonos_de_mascara  # Requiere scipy, como el backend raster
+    ano, mascara, porcentaje, ruta = tarea
+    transform, crs, epsg = _escena['raster']
+    geometrias = gpd.GeoSeries(poligonos_de_mascara(mascara, transform), crs=crs)
+    if epsg is not None:
+        geometrias = geometrias.to_crs(epsg=epsg)
+    return _dibujar_reduccion(ano, geometrias.to_numpy(), porcentaje, ruta)
+
+
+def _fotograma_puntos(tarea):
+    ano, ruta = tarea
+    fig, ax = _figura()
+    # Puntos acumulados hasta el año, un color por año como en la ventana
+    for a in np.unique(_puntos['ano'][_puntos['ano'] <= ano]):
+        puntos = _puntos[_puntos['ano'] == a]
+        ax.scatter(puntos['x'], puntos['y'], color=COLORES_ANOS[(a - 2023) % len(COLORES_ANOS)], s=1)
+    ax.text(0.05, 0.95, f"Año: {ano}", transform=ax.transAxes, fontsize=14, verticalalignment='top',
+            bbox=dict(facecolor='white', alpha=0.5))
+    return _guardar(fig, ruta)
+
+
+def escena(gdf_contorno, estilo_contorno, zoom=12, fuente_mapa_base=FUENTE_OSM, margen=0.1, tamano=(8, 6), dpi=100):
+    # El mapa base se obtiene una vez aquí y viaja a cada proceso; los trabajadores no usan la red
+    minx, miny, maxx, maxy = gdf_contorno.total_bounds
+    w, h = maxx - minx, maxy - miny
+    limites = (minx - margen * w, maxx + margen * w, miny - margen * h, maxy + margen * h)
+    try:
+        fondo = obtener_fondo(limites, zoom, fuente_mapa_base)
+    except Exception as e:
+        print(f"No se pudo obtener el mapa base ({e}); los fotogramas se dibujan sin fondo.")
+        fondo = None
+    return {'limites': limites, 'fondo': fondo, 'contorno': gdf_contorno.geometry, 'estilo_contorno': estilo_contorno,
+            'tamano': tamano, 'dpi': dpi}
+
+
+def renderizar(funcion, tareas, escena_comun, puntos=None, procesos=None):
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), initializer=_iniciar_trabajador,
+                             initargs=(escena_comun, puntos)) as pool:
+        return list(pool.map(funcion, tareas))
+
+
+def escribir_animacion(rutas, salida, fps=1):
+    # salida .gif o .mp4; cualquier otra ruta es un directorio donde ya quedaron los PNG
+    extension = os.path.splitext(salida)[1].lower()
+    if extension == '.gif':
+        imagenes = [Image.open(r) for r in rutas]
+        imagenes[0].save(salida, save_all=True, append_images=imagenes[1:], duration=int(1000 / fps), loop=0)
+    elif extension == '.mp4':
+        directorio = os.path.dirname(rutas[0])
+        ffmpeg = matplotlib.rcParams['animation.ffmpeg_path']
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-framerate', str(fps),
+                        '-i', os.path.join(directorio, PATRON_FOTOGRAMA), '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+                        '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', salida], check=True)
+    return salida
+
+
+def _exportar(funcion, tareas_por_ruta, salida, escena_comun, puntos, fps, procesos):
+    extension = os.path.splitext(salida)[1].lower()
+    if extension in ('.gif', '.mp4'):
+        with tempfile.TemporaryDirectory() as directorio:
+            tareas = tareas_por_ruta(directorio)
+            return escribir_animacion(renderizar(funcion, tareas, escena_comun, puntos, procesos), salida, fps)
+    os.makedirs(salida, exist_ok=True)
+    renderizar(funcion, tareas_por_ruta(salida), escena_comun, puntos, procesos)
+    return salida
+
+
+def exportar_reduccion(gdf_original, simulaciones, porcentajes, salida, ano_inicial=2023, fps=1, procesos=None,
+                       fuente_mapa_base=FUENTE_OSM):
+    # gdf_original y simulaciones ya en EPSG:3857, como los usa visualizar_reduccion
+    escena_comun = escena(gdf_original, {'facecolor': 'none', 'edgecolor': 'red', 'linewidth': 2}, zoom=13,
+                          fuente_mapa_base=fuente_mapa_base)
+
+    if hasattr(simulaciones, 'mascara'):
+        # FotogramasRaster: aquí solo se calculan las máscaras; cada trabajador vectoriza la suya
+        escena_comun['raster'] = simulaciones.parametros_vectorizacion()
+        funcion = _fotograma_reduccion_raster
+
+        def tareas(directorio):
+            return [(ano_inicial + i, simulaciones.mascara(i), float(porcentajes[i]),
+                     os.path.join(directorio, PATRON_FOTOGRAMA % i))
+                    for i in range(len(simulaciones))]
+    else:
+        funcion = _fotograma_reduccion
+
+        def tareas(directorio):
+            return [(ano_inicial + i, gdf.geometry.to_numpy(), float(porcentajes[i]),
+                     os.path.join(directorio, PATRON_FOTOGRAMA % i))
+                    for i, gdf in enumerate(simulaciones)]
+
+    return _exportar(funcion, tareas, salida, escena_comun, None, fps, procesos)
+
+
+def exportar_microplasticos(gdf_cienegas, almacen, salida, fps=1, procesos=None, fuente_mapa_base=FUENTE_OSM):
+    # Los puntos se envían una vez por proceso; cada tarea solo lleva el año y la ruta del fotograma
+    escena_comun = escena(gdf_cienegas, {'facecolor': 'none', 'edgecolor': 'blue', 'linewidth': 2}, zoom=12,
+                          fuente_mapa_base=fuente_mapa_base)
+
+    def tareas(directorio):
+        return [(ano, os.path.join(directorio, PATRON_FOTOGRAMA % i)) for i, ano in enumerate(almacen.anos)]
+
+    return _exportar(_fotograma_puntos, tareas, salida, escena_comun, almacen.datos, fps, procesos)
@@ -0,0 +1,132 @@
+import argparse
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from capas import agregar_argumentos_datos, cargar_cienegas, rutas_de_argumentos
+from motor_simulacion import ANO_BASE, MotorReduccion, cargar_capas
+from muestreo import crear_generador, muestrear_puntos_en_poligono
+from proximidad import MotorProximidad
+
+# Barrido de parámetros sin editar el código, p. ej.:
+#   python barrido.py --umbral-industrias 3000 5000 7000 --tasa-incremento 1.05 1.1 --salida barrido.csv
+
+
+class BarridoParametros:
+    def __init__(self, gdf_cienegas, gdf_industrias, gdf_carreteras, semilla=None):
+        self.geometrias = list(gdf_cienegas.geometry)
+        self.proximidad = MotorProximidad(gdf_industrias, gdf_carreteras)
+        self.semilla = semilla
+        self._distancias = {}  # año relativo -> distancias (polígonos x puntos) a industrias y carreteras
+
+    def distancias_ano(self, k, n_max, max_distancia):
+        # Lo costoso (muestreo y distancias) se calcula una sola vez por año con el mayor número de puntos pedido
+        if k in self._distancias:
+            guardadas, n_guardado, max_guardada = self._distancias[k]
+            if n_guardado >= n_max and max_guardada >= max_distancia:
+                return guardadas
+
+        rng = crear_generador(None if self.semilla is None else [self.semilla, k])
+        dist_industrias = np.full((len(self.geometrias), n_max), np.inf)
+        dist_carreteras = np.full((len(self.geometrias), n_max), np.inf)
+        for i, poligono in enumerate(self.geometrias):
+            x, y = muestrear_puntos_en_poligono(poligono, n_max, rng)
+            dist_industrias[i, :len(x)] = self.proximidad.distancias_industrias(x, y, max_distancia)
+            dist_carreteras[i, :len(x)] = self.proximidad.distancias_carreteras(x, y, max_distancia)
+
+        self._distancias[k] = (dist_industrias, dist_carreteras), n_max, max_distancia
+        return dist_industrias, dist_carreteras
+
+    def evaluar_microplasticos(self, umbrales_industrias, umbrales_carreteras, tasas_incremento,
+                               nums_puntos_inicial, anos=10):
+        # Una muestra con n puntos es el prefijo de la muestra maestra: todas las combinaciones la comparten
+        umbrales_industrias = np.sort(np.asarray(umbrales_industrias, dtype=np.float64))
+        umbrales_carreteras = np.sort(np.asarray(umbrales_carreteras, dtype=np.float64))
+        max_distancia = max(umbrales_industrias[-1], umbrales_carreteras[-1])
+        combinaciones = list(itertools.product(tasas_incremento, nums_puntos_inicial))
+
+        tablas = []
+        for k in range(anos):
+            tamanos = {(tasa, num): int(num * tasa ** k) for tasa, num in combinaciones}
+            dist_industrias, dist_carreteras = self.distancias_ano(k, max(tamanos.values()), max_distancia)
+
+            for (tasa, num), n in tamanos.items():
+                # Conteo de distancias menores que cada umbral con un solo searchsorted
+                orden_ind = np.sort(dist_industrias[:, :n], axis=None)
+                orden_car = np.sort(dist_carreteras[:, :n], axis=None)
+                cuenta_ind = np.searchsorted(orden_ind, umbrales_industrias, side='left')
+                cuenta_car = np.searchsorted(orden_car, umbrales_carreteras, side='left')
+
+                ind, car = np.meshgrid(np.arange(len(umbrales_industrias)), np.arange(len(umbrales_carreteras)),
+                                       indexing='ij')
+                tablas.append(pd.DataFrame({
+                    'simulacion': 'microplasticos',
+                    'umbral_industrias': umbrales_industrias[ind.ravel()],
+                    'umbral_carreteras': umbrales_carreteras[car.ravel()],
+                    'tasa_incremento': tasa,
+                    'num_puntos_inicial': num,
+                    'año': ANO_BASE + k,
+                    'puntos_industrias': cuenta_ind[ind.ravel()],
+                    'puntos_carreteras': cuenta_car[car.ravel()],
+                }))
+
+        tabla = pd.concat(tablas, ignore_index=True)
+        tabla['puntos'] = tabla['puntos_industrias'] + tabla['puntos_carreteras']
+        return tabla
+
+
+def barrer_reduccion(gdf, tasas_anuales, anos=10, ano_inicial=ANO_BASE):
+    # La descomposición en partes, áreas y perímetros se comparten entre todas las tasas
+    motor = MotorReduccion()
+    motor.preparar_reduccion(gdf)
+    filas = []
+    for tasa_anual in tasas_anuales:
+        motor.tasa_anual = tasa_anual
+        for i in range(anos):
+            ano = ano_inicial + i
+            geometrias, perdidos = motor.reducir_partes(motor.calcular_factor_reduccion(ano))
+            area = float(shapely.area(geometrias[~shapely.is_missing(geometrias)]).sum())
+            filas.append({'simulacion': 'reduccion', 'tasa_anual': tasa_anual, 'año': ano, 'area': area,
+                          'reduccion_pct': (1 - area / motor._area_total) * 100, 'poligonos_perdidos': perdidos})
+    return pd.DataFrame(filas)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de las simulaciones de las Ciénegas de Lerma")
+    parser.add_argument('--umbral-industrias', type=float, nargs='+', default=[5000])
+    parser.add_argument('--umbral-carreteras', type=float, nargs='+', default=[2000])
+    parser.add_argument('--tasa-incremento', type=float, nargs='+', default=[1.1])
+    parser.add_argument('--puntos', type=int, nargs='+', default=[1000], help="Valores de num_puntos_inicial")
+    parser.add_argument('--tasa-anual', type=float, nargs='+', default=[0.01], help="Tasas de reducción anual")
+    parser.add_argument('--anos', type=int, default=10)
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--salida', default='barrido.csv')
+    agregar_argumentos_datos(parser)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    rutas = rutas_de_argumentos(args)
+    # Las capas se recortan con el mayor umbral barrido; con el margen por omisión los umbrales mayores
+    # no verían las fuentes más lejanas. La caché de capas guarda un archivo por margen.
+    gdf_industrias, gdf_carreteras, gdf_cienegas = cargar_capas(*rutas, margen_industrias=max(args.umbral_industrias),
+                                                                margen_carreteras=max(args.umbral_carreteras))
+    barrido = BarridoParametros(gdf_cienegas, gdf_industrias, gdf_carreteras, args.semilla)
+    tabla_micro = barrido.evaluar_microplasticos(args.umbral_industrias, args.umbral_carreteras,
+                                                 args.tasa_incremento, args.puntos, args.anos)
+    tabla_reduccion = barrer_reduccion(cargar_cienegas(rutas[2], epsg=None), args.tasa_anual, args.anos)
+
+    # Una sola tabla ordenada; las columnas que no aplican a una simulación quedan vacías
+    pd.concat([tabla_micro, tabla_reduccion], ignore_index=True).to_csv(args.salida, index=False)
+    print(f"Barrido guardado en {args.salida}: {len(tabla_micro)} filas de microplásticos, "
+          f"{len(tabla_reduccion)} de reducción.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
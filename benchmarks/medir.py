@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')  # Sin pantalla: se mide el dibujo, no la ventana
+import geopandas as gpd
+import matplotlib.pyplot as plt
+import numpy as np
+import shapely
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from almacen_puntos import AlmacenPuntos
+from animacion_offline import COLORES_ANOS
+from benchmarks.sinteticos import ESCALAS, escribir_shapefiles, generar_capas
+from capas import cargar_con_cache, cargar_industrias, extension_influencia, leer_capa, leer_industrias
+from densidad import MallaDensidad
+from humedal_cienegas_lerma_sim import SimulacionCienegas
+from mapa_base import FUENTE_LOCAL
+from MicroplasticosTiempo import SimulacionMicroplasticosTiempo
+from motor_simulacion import ANO_BASE, MotorMicroplasticos, MotorReduccion
+from proximidad import UMBRAL_INDUSTRIAS
+from sesion import SesionDatos
+
+# Mide las rutas críticas sobre capas sintéticas, p. ej. desde la raíz del repositorio:
+#   python -m benchmarks.medir --escalas pequena mediana --repeticiones 5
+#   python -m benchmarks.medir --comparar benchmarks/resultados/anterior.json
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+ANOS_VISTA = range(ANO_BASE, ANO_BASE + 5)  # Los años que recorre la ventana de MicroplasticosTiempo.py
+
+
+def _lienzo_agg(vista):
+    # Misma figura que las ventanas, sobre Agg en lugar de Tk
+    vista.fig = Figure(figsize=(8, 6))
+    vista.canvas = FigureCanvasAgg(vista.fig)
+    vista.ax = vista.fig.add_subplot()
+
+
+class VistaTiempoSinVentana(SimulacionMicroplasticosTiempo):
+    # La ventana año por año sin Tk: mismas capas estáticas, niveles de detalle, fondos por año y blitting
+    def __init__(self, gdf_cienegas, almacen):
+        self.sesion = SesionDatos()
+        self.gdf_cienegas = gdf_cienegas
+        self.puntos_por_ano = almacen
+        self.modelo = 'puntos'
+        self.fuente_mapa_base = FUENTE_LOCAL  # Sin red: el tiempo no depende de la descarga de teselas
+        self.colores = COLORES_ANOS
+        self.colecciones = {}
+        self.fondo_estatico = None
+        self.fondos_por_ano = {}
+        self.ano_actual = ANO_BASE
+        self.fig = self.ax = self.canvas = None
+
+    def preparar_mapa(self):
+        _lienzo_agg(self)
+        self.dibujar_capas_estaticas()
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def casos(escala, directorio):
+    # Cada caso es (nombre, preparación que no se mide, función medida)
+    gdf_industrias, gdf_carreteras, gdf_cienegas = generar_capas(escala)
+    rutas = escribir_shapefiles(os.path.join(directorio, escala), gdf_industrias, gdf_carreteras, gdf_cienegas)
+    motor = MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras)
+    reduccion = MotorReduccion()
+    poligono = max(gdf_cienegas.geometry, key=lambda g: g.area)
+    cache = os.path.join(directorio, escala, "cache")
+    extension = extension_influencia(gdf_cienegas, UMBRAL_INDUSTRIAS)
+    almacen = AlmacenPuntos()
+    for ano in ANOS_VISTA:
+        almacen.agregar(ano, *motor.simular_ano(ano, semilla=0))
+    simulaciones = reduccion.simular_reduccion(gdf_cienegas, anos=10)
+
+    def simular_reduccion_raster():
+        from reduccion_raster import ReduccionRaster  # Requiere scipy; solo este caso lo necesita
+        return ReduccionRaster(10).simular_reduccion(gdf_cienegas, anos=10)
+
+    def dibujar_vista_tiempo():
+        # Lo que hace mostrar_mapa al abrir la ventana y avanzar año por año
+        vista = VistaTiempoSinVentana(gdf_cienegas, almacen)
+        for ano in ANOS_VISTA:
+            vista.ano_actual = ano
+            vista.mostrar_mapa()
+
+    def dibujar_reduccion():
+        # Lo que hace visualizar_reduccion: capas estáticas una vez y cada cuadro de la animación dibujado completo
+        vista = SimulacionCienegas()
+        vista.fuente_mapa_base = FUENTE_LOCAL
+        vista.metricas = reduccion.metricas
+        _lienzo_agg(vista)
+        vista.preparar_ejes_reduccion(gdf_cienegas, simulaciones)
+        for cuadro in range(len(simulaciones)):
+            vista.dibujar_cuadro(cuadro)
+            vista.canvas.draw()
+
+    def dibujar_densidad():
+        malla = MallaDensidad.desde_cienegas(gdf_cienegas, 100)
+        motor.acumular_densidad(malla, 2023, 1000, semilla=0)
+        fig, ax = plt.subplots(figsize=(8, 6))
+        malla.dibujar(ax)
+        fig.canvas.draw()
+        plt.close(fig)
+
+    return [
+        ('carga_shapefile', lambda: leer_capa(rutas['cienegas'], 3857)),
+        # Lo que hace cargar_industrias sin caché: un shapefile por municipio y sector, en hilos y recortado al bbox
+        ('carga_industrias', lambda: leer_industrias(rutas['industrias'], 3857, extension)),
+        ('carga_industrias_cache', lambda: cargar_industrias(rutas['industrias'], gdf_cienegas=gdf_cienegas,
+                                                             directorio=cache)),
+        ('carga_cache', lambda: cargar_con_cache("cienegas_bench", [rutas['cienegas']],
+                                                 lambda: leer_capa(rutas['cienegas'], 3857), directorio=cache)),
+        ('indices_proximidad', lambda: MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras).obtener_proximidad()),
+        # Lo que hace dispersar_microplasticos en la ventana, sin Tk: muestreo y clasificación por distancia
+        ('dispersar_microplasticos', lambda: motor.dispersar(1000, semilla=0)),
+        ('reducir_geometria', lambda: reduccion.reducir_geometria(poligono, 0.05, poligono.area, poligono.area)),
+        ('simular_reduccion', lambda: reduccion.simular_reduccion(gdf_cienegas, anos=10)),
+        ('simular_reduccion_raster', simular_reduccion_raster),
+        ('dibujar_vista_tiempo', dibujar_vista_tiempo),
+        ('dibujar_reduccion', dibujar_reduccion),
+        ('dibujar_densidad', dibujar_densidad),
+    ]
+
+
+def entorno():
+    return {'python': platform.python_version(), 'plataforma': platform.platform(), 'procesador': platform.processor(),
+            'nucleos': os.cpu_count(), 'numpy': np.__version__, 'shapely': shapely.__version__,
+            'geopandas': gpd.__version__, 'matplotlib': matplotlib.__version__}
+
+
+def ejecutar(escalas, repeticiones, filtro=None):
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for escala in escalas:
+            for nombre, funcion in casos(escala, directorio):
+                if filtro and nombre not in filtro:
+                    continue
+                funcion()  # Calentamiento: cachés, índices y compilación de rutas de matplotlib
+                tiempos = cronometrar(funcion, repeticiones)
+                resultados.append({'caso': nombre, 'escala': escala, 'parametros': ESCALAS[escala],
+                                   'tiempos': tiempos, 'minimo': min(tiempos), 'mediana': statistics.median(tiempos)})
+                print(f"{escala:>8} {nombre:<26} mediana {resultados[-1]['mediana'] * 1000:10.2f} ms")
+    return resultados
+
+
+def comparar(resultados, ruta_anterior):
+    # Cociente de medianas: < 1 es una mejora, > 1 una regresión
+    with open(ruta_anterior, encoding='utf-8') as f:
+        anteriores = {(r['caso'], r['escala']): r['mediana'] for r in json.load(f)['resultados']}
+    for r in resultados:
+        anterior = anteriores.get((r['caso'], r['escala']))
+        if anterior:
+            print(f"{r['escala']:>8} {r['caso']:<26} x{r['mediana'] / anterior:6.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks con capas sintéticas")
+    parser.add_argument('--escalas', nargs='+', choices=list(ESCALAS), default=['pequena', 'mediana'])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--casos', nargs='+', default=None, help="Solo estos casos (por nombre)")
+    parser.add_argument('--salida', default=None, help="Archivo JSON (por defecto, benchmarks/resultados/<fecha>.json)")
+    parser.add_argument('--comparar', default=None, help="JSON de una corrida anterior")
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar(args.escalas, args.repeticiones, args.casos)
+    salida = args.salida or os.path.join(DIRECTORIO_RESULTADOS, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump({'fecha': datetime.now().isoformat(timespec='seconds'), 'entorno': entorno(),
+                   'resultados': resultados}, f, indent=2)
+    print(f"Resultados guardados en {salida}")
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import LineString, MultiPolygon, Polygon
+from shapely.ops import unary_union
+
+from capas import RUTAS_INDUSTRIAS
+
+# Capas sintéticas parecidas a las de las Ciénegas de Lerma, en EPSG:3857 y sin depender de rutas locales
+
+CENTRO = (-11_070_000.0, 2_185_000.0)  # Ciénegas de Lerma en Web Mercator
+EXTENSION = 15_000.0  # Lado en metros de la zona donde se reparten las ciénegas
+
+ESCALAS = {
+    # ciénegas (filas), polígonos por fila, vértices por polígono, industrias, carreteras, vértices por carretera
+    'pequena': {'cienegas': 3, 'partes': 2, 'vertices': 64, 'industrias': 200, 'carreteras': 50, 'tramos': 20},
+    'mediana': {'cienegas': 10, 'partes': 4, 'vertices': 512, 'industrias': 2_000, 'carreteras': 500, 'tramos': 50},
+    'grande': {'cienegas': 30, 'partes': 8, 'vertices': 4_096, 'industrias': 20_000, 'carreteras': 5_000, 'tramos': 100},
+}
+
+
+def poligono_irregular(rng, centro, radio, vertices):
+    # Estrella irregular: radio ruidoso y suavizado para imitar una orilla natural
+    angulos = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    ruido = rng.normal(0, 1, vertices)
+    ruido = np.convolve(np.concatenate([ruido[-4:], ruido, ruido[:4]]), np.ones(9) / 9, mode='valid')
+    radios = radio * (1 + 0.3 * ruido)
+    return Polygon(np.column_stack([centro[0] + radios * np.cos(angulos), centro[1] + radios * np.sin(angulos)]))
+
+
+def generar_cienegas(rng, cienegas, partes, vertices):
+    filas = []
+    for _ in range(cienegas):
+        centro = np.asarray(CENTRO) + rng.uniform(-EXTENSION / 2, EXTENSION / 2, 2)
+        poligonos = [poligono_irregular(rng, centro + rng.uniform(-800, 800, 2), rng.uniform(150, 500), vertices)
+                     for _ in range(partes)]
+        union = unary_union(poligonos)  # Las partes que se enciman se funden, como en una capa válida
+        filas.append(union if isinstance(union, MultiPolygon) else MultiPolygon([union]))
+    return gpd.GeoDataFrame({'nombre': [f"cienega_{i}" for i in range(cienegas)]}, geometry=filas, crs=3857)
+
+
+def generar_industrias(rng, industrias):
+    x, y = np.asarray(CENTRO)[:, None] + rng.uniform(-EXTENSION, EXTENSION, (2, industrias))
+    return gpd.GeoDataFrame({'id': np.arange(industrias)}, geometry=gpd.points_from_xy(x, y), crs=3857)
+
+
+def generar_carreteras(rng, carreteras, tramos):
+    # Caminatas aleatorias con tramos de unos 200 m
+    inicios = np.asarray(CENTRO) + rng.uniform(-EXTENSION, EXTENSION, (carreteras, 2))
+    pasos = rng.normal(0, 200, (carreteras, tramos, 2))
+    vertices = inicios[:, None, :] + np.cumsum(pasos, axis=1)
+    return gpd.GeoDataFrame({'id': np.arange(carreteras)}, geometry=[LineString(v) for v in vertices], crs=3857)
+
+
+def generar_capas(escala, semilla=0):
+    parametros = ESCALAS[escala]
+    rng = np.random.default_rng(semilla)
+    return (generar_industrias(rng, parametros['industrias']),
+            generar_carreteras(rng, parametros['carreteras'], parametros['tramos']),
+            generar_cienegas(rng, parametros['cienegas'], parametros['partes'], parametros['vertices']))
+
+
+def escribir_shapefiles(directorio, gdf_industrias, gdf_carreteras, gdf_cienegas):
+    # Mismo formato que las capas reales, para medir la carga desde disco: las industrias se reparten en un
+    # shapefile por municipio y sector con las mismas claves que RUTAS_INDUSTRIAS
+    os.makedirs(directorio, exist_ok=True)
+    claves = list(RUTAS_INDUSTRIAS)
+    rutas = {'industrias': {clave: os.path.join(directorio, f"Industrias_{clave}.shp") for clave in claves},
+             'carreteras': os.path.join(directorio, "CallesSinteticas.shp"),
+             'cienegas': os.path.join(directorio, "CienegasSinteticas.shp")}
+    for i, clave in enumerate(claves):
+        gdf_industrias.iloc[i::len(claves)].to_file(rutas['industrias'][clave])
+    gdf_carreteras.to_file(rutas['carreteras'])
+    gdf_cienegas.to_file(rutas['cienegas'])
+    return rutas
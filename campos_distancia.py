@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import shapely
+
+import instrumentacion
+
+# Los campos se guardan junto a MapaCienegas.tif
+DIRECTORIO_CAMPOS = os.path.dirname(os.path.abspath(__file__))
+PREFIJO_CAMPOS = "MapaCienegas_distancias"
+
+
+def _clave_campos(proximidad, limites, resolucion):
+    # La clave cambia si cambian las geometrías de origen, la extensión o la resolución
+    h = hashlib.sha1()
+    h.update(json.dumps([list(map(float, limites)), float(resolucion)]).encode())
+    for arbol in (proximidad.arbol_industrias, proximidad.arbol_carreteras):
+        h.update(str(len(arbol)).encode())
+        for wkb in shapely.to_wkb(arbol.geometries):
+            h.update(wkb)
+    return h.hexdigest()[:16]
+
+
+class CampoDistancias:
+    def __init__(self, gdf_cienegas, proximidad, resolucion=50, directorio=DIRECTORIO_CAMPOS):
+        self.resolucion = float(resolucion)
+        self.umbral_industrias = proximidad.umbral_industrias
+        self.umbral_carreteras = proximidad.umbral_carreteras
+
+        minx, miny, maxx, maxy = gdf_cienegas.total_bounds
+        self.minx, self.miny = minx, miny
+        self.columnas = max(int(np.ceil((maxx - minx) / self.resolucion)), 1)
+        self.filas = max(int(np.ceil((maxy - miny) / self.resolucion)), 1)
+
+        clave = _clave_campos(proximidad, (minx, miny, maxx, maxy), self.resolucion)
+        base = os.path.join(directorio, f"{PREFIJO_CAMPOS}_{clave}")
+        self.ruta_industrias = base + "_industrias.npy"
+        self.ruta_carreteras = base + "_carreteras.npy"
+
+        if not (os.path.exists(self.ruta_industrias) and os.path.exists(self.ruta_carreteras)):
+            self.calcular(proximidad)
+
+        # Memoria mapeada: solo se leen del disco las celdas consultadas
+        self.dist_industrias = np.load(self.ruta_industrias, mmap_mode='r')
+        self.dist_carreteras = np.load(self.ruta_carreteras, mmap_mode='r')
+
+    def centros(self):
+        xs = self.minx + (np.arange(self.columnas) + 0.5) * self.resolucion
+        ys = self.miny + (np.arange(self.filas) + 0.5) * self.resolucion
+        return np.meshgrid(xs, ys)
+
+    def calcular(self, proximidad):
+        # Distancia exacta desde el centro de cada celda; se paga una sola vez
+        cx, cy = self.centros()
+        for ruta, calcular in ((self.ruta_industrias, proximidad.distancias_industrias),
+                               (self.ruta_carreteras, proximidad.distancias_carreteras)):
+            campo = calcular(cx.ravel(), cy.ravel()).reshape(self.filas, self.columnas)
+            temporal = ruta + ".tmp.npy"
+            np.save(temporal, campo.astype(np.float32))
+            os.replace(temporal, ruta)  # Escritura atómica para no dejar cachés a medias
+        print(f"Campos de distancia calculados ({self.filas}x{self.columnas} celdas de {self.resolucion:g} m).")
+
+    def indices(self, x, y):
+        instrumentacion.contar('distancias.consultas_raster', len(x))
+        columnas = ((np.asarray(x) - self.minx) // self.resolucion).astype(np.intp)
+        filas = ((np.asarray(y) - self.miny) // self.resolucion).astype(np.intp)
+        np.clip(columnas, 0, self.columnas - 1, out=columnas)
+        np.clip(filas, 0, self.filas - 1, out=filas)
+        return filas, columnas
+
+    def distancias_industrias(self, x, y, max_distancia=None):
+        filas, columnas = self.indices(x, y)
+        return np.asarray(self.dist_industrias[filas, columnas], dtype=np.float64)
+
+    def distancias_carreteras(self, x, y, max_distancia=None):
+        filas, columnas = self.indices(x, y)
+        return np.asarray(self.dist_carreteras[filas, columnas], dtype=np.float64)
+
+    def clasificar(self, x, y):
+        # Misma interfaz que MotorProximidad.clasificar; el error es como máximo media diagonal de celda
+        filas, columnas = self.indices(x, y)
+        cerca_industrias = self.dist_industrias[filas, columnas] < self.umbral_industrias
+        cerca_carreteras = self.dist_carreteras[filas, columnas] < self.umbral_carreteras
+        return np.asarray(cerca_industrias), np.asarray(cerca_carreteras)
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PureWindowsPath
+
+import geopandas as gpd
+import pandas as pd
+from pyogrio import read_info
+from shapely.geometry import box
+
+import instrumentacion
+from proximidad import UMBRAL_INDUSTRIAS, UMBRAL_CARRETERAS
+
+RUTAS_INDUSTRIAS = {
+    'Lerma_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Apoyo\ApoyoLerma.shp",
+    'Lerma_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Constructoras\ConstructorasLerma.shp",
+    'Lerma_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Manufactureras\ManufaLerma.shp",
+    'Lerma_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Transporte\TransporteLerma.shp",
+    'Ocoyoacac_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Apoyo\ApoyoOco.shp",
+    'Ocoyoacac_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Constructoras\ConstructorasOco.shp",
+    'Ocoyoacac_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Manufactureras\ManuOco.shp",
+    'Ocoyoacac_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Transporte\TransporteOco.shp",
+    'SanMateo_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Apoyo\ApoyoSanMateo.shp",
+    'SanMateo_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Constructoras\ConstructorasSanMateo.shp",
+    'SanMateo_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Manufactureras\ManuSanMateo.shp",
+    'SanMateo_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Transporte\TransporteSanMateo.shp",
+}
+RUTA_CARRETERAS = r"C:\Users\Pablo\Downloads\ShapeIndustrias\CallesCienegas\CallesCienegas.shp"
+RUTA_CIENEGAS = r"C:\Users\Pablo\Downloads\Shapesxd\ShapeCienegas.shp"
+DIRECTORIO_DATOS = r"C:\Users\Pablo\Downloads"  # Raíz común de las rutas anteriores
+DIRECTORIO_INDUSTRIAS = r"C:\Users\Pablo\Downloads\ShapeIndustrias"
+
+DIRECTORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_capas")
+EXTENSIONES_SHAPEFILE = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+
+def _reubicar(ruta, origen, destino):
+    # Misma estructura de carpetas que la ruta original de Windows, bajo otro directorio
+    return os.path.join(destino, *PureWindowsPath(ruta).relative_to(origen).parts)
+
+
+def rutas_industrias(directorio):
+    return {clave: _reubicar(ruta, DIRECTORIO_INDUSTRIAS, directorio) for clave, ruta in RUTAS_INDUSTRIAS.items()}
+
+
+def agregar_argumentos_datos(parser):
+    # Opciones de los programas de línea de comandos para leer las capas desde otro lugar
+    parser.add_argument('--datos', default=None, metavar='DIR',
+                        help="Directorio con ShapeIndustrias/ y Shapesxd/, con la misma estructura que en la máquina original")
+    parser.add_argument('--industrias', default=None, metavar='DIR',
+                        help="Directorio de industrias, con una carpeta por municipio y sector")
+    parser.add_argument('--carreteras', default=None, metavar='SHP', help="Shapefile de carreteras")
+    parser.add_argument('--cienegas', default=None, metavar='SHP', help="Shapefile de ciénegas")
+
+
+def rutas_de_argumentos(args):
+    # (rutas de industrias, ruta de carreteras, ruta de ciénegas); cada opción explícita manda sobre --datos
+    if args.datos:
+        industrias = rutas_industrias(_reubicar(DIRECTORIO_INDUSTRIAS, DIRECTORIO_DATOS, args.datos))
+        carreteras = _reubicar(RUTA_CARRETERAS, DIRECTORIO_DATOS, args.datos)
+        cienegas = _reubicar(RUTA_CIENEGAS, DIRECTORIO_DATOS, args.datos)
+    else:
+        industrias, carreteras, cienegas = RUTAS_INDUSTRIAS, RUTA_CARRETERAS, RUTA_CIENEGAS
+    if args.industrias:
+        industrias = rutas_industrias(args.industrias)
+    return industrias, args.carreteras or carreteras, args.cienegas or cienegas
+
+
+def archivos_fuente(ruta):
+    # Un shapefile son varios archivos; cualquiera de ellos invalida la caché
+    base, _ = os.path.splitext(ruta)
+    return [base + ext for ext in EXTENSIONES_SHAPEFILE if os.path.exists(base + ext)]
+
+
+def _hash_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _huellas(rutas):
+    huellas = {}
+    for ruta in rutas:
+        for archivo in archivos_fuente(ruta):
+            estado = os.stat(archivo)
+            huellas[archivo] = {'mtime_ns': estado.st_mtime_ns, 'tamano': estado.st_size}
+    return huellas
+
+
+def _manifiesto_vigente(manifiesto, huellas, parametros):
+    # (vigente, fechas actualizadas): el manifiesto solo se reescribe si se actualizó alguna fecha
+    if manifiesto.get('parametros') != parametros:
+        return False, False
+    guardadas = manifiesto.get('archivos', {})
+    if set(guardadas) != set(huellas):
+        return False, False
+
+    actualizado = False
+    for archivo, huella in huellas.items():
+        guardada = guardadas[archivo]
+        if guardada['mtime_ns'] == huella['mtime_ns'] and guardada['tamano'] == huella['tamano']:
+            continue
+        # Cambió la fecha de modificación: solo invalidamos si cambió también el contenido
+        if guardada['tamano'] != huella['tamano'] or guardada['sha256'] != _hash_archivo(archivo):
+            return False, False
+        guardada['mtime_ns'] = huella['mtime_ns']
+        actualizado = True
+    return True, actualizado
+
+
+def _escribir_json(ruta, datos):
+    temporal = ruta + ".tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=1)
+    os.replace(temporal, ruta)
+
+
+def cargar_con_cache(nombre, rutas, lector, parametros=None, directorio=DIRECTORIO_CACHE):
+    # Devuelve la capa desde GeoParquet si las fuentes no cambiaron; si no, la lee y la guarda
+    parametros = parametros or {}
+    ruta_datos = os.path.join(directorio, f"{nombre}.parquet")
+    ruta_manifiesto = os.path.join(directorio, f"{nombre}.json")
+    huellas = _huellas(rutas)
+
+    if os.path.exists(ruta_datos) and os.path.exists(ruta_manifiesto):
+        with open(ruta_manifiesto, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        vigente, actualizado = _manifiesto_vigente(manifiesto, huellas, parametros)
+        if vigente:
+            instrumentacion.contar('cache_capas.aciertos')
+            with instrumentacion.fase(f"cache:{nombre}"):
+                gdf = gpd.read_parquet(ruta_datos)
+            if actualizado:
+                _escribir_json(ruta_manifiesto, manifiesto)  # Conserva las fechas nuevas para no volver a calcular el hash
+            return gdf
+
+    instrumentacion.contar('cache_capas.fallos')
+    gdf = lector()
+
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        temporal = ruta_datos + ".tmp"
+        gdf.to_parquet(temporal)
+        os.replace(temporal, ruta_datos)
+        for archivo, huella in huellas.items():
+            huella['sha256'] = _hash_archivo(archivo)
+        _escribir_json(ruta_manifiesto, {'parametros': parametros, 'archivos': huellas})
+    except (ImportError, OSError) as e:
+        # Sin pyarrow o sin permisos de escritura se sigue trabajando sin caché
+        print(f"No se pudo guardar la caché de {nombre}: {e}")
+
+    return gdf
+
+
+def extension_influencia(gdf_cienegas, margen):
+    # Extensión de las ciénegas ampliada con el radio de influencia
+    minx, miny, maxx, maxy = gdf_cienegas.total_bounds
+    return gpd.GeoSeries([box(minx - margen, miny - margen, maxx + margen, maxy + margen)],
+                         crs=gdf_cienegas.crs)
+
+
+def _bbox_en_fuente(ruta, extension):
+    # pyogrio exige el bbox en el CRS del archivo, así que lo reproyectamos antes de leer
+    if extension is None:
+        return None
+    crs_fuente = read_info(ruta)['crs']
+    if crs_fuente is not None and extension.crs is not None:
+        extension = extension.to_crs(crs_fuente)
+    return tuple(extension.total_bounds)
+
+
+def leer_capa(ruta, epsg=None, extension=None):
+    with instrumentacion.fase('lectura'):
+        gdf = gpd.read_file(ruta, bbox=_bbox_en_fuente(ruta, extension))
+    if epsg is None:
+        return gdf
+    with instrumentacion.fase('to_crs'):
+        return gdf.to_crs(epsg=epsg)
+
+
+def _leer_industria(clave, ruta, epsg, extension):
+    gdf = leer_capa(ruta, epsg, extension)
+    municipio, sector = clave.split('_', 1)  # p. ej. 'SanMateo_Manufactureras'
+    gdf['municipio'] = municipio
+    gdf['sector'] = sector
+    return gdf
+
+
+def leer_industrias(rutas, epsg=3857, extension=None, max_hilos=None):
+    # La lectura es sobre todo E/S y GDAL libera el GIL, por eso basta un pool de hilos
+    with ThreadPoolExecutor(max_workers=max_hilos or min(len(rutas), 8)) as pool:
+        industrias = list(pool.map(lambda item: _leer_industria(item[0], item[1], epsg, extension),
+                                   rutas.items()))
+
+    gdf = gpd.GeoDataFrame(pd.concat(industrias, ignore_index=True))
+    claves = [clave.split('_', 1) for clave in rutas]
+    gdf['municipio'] = pd.Categorical(gdf['municipio'], categories=list(dict.fromkeys(m for m, _ in claves)))
+    gdf['sector'] = pd.Categorical(gdf['sector'], categories=list(dict.fromkeys(s for _, s in claves)))
+    return gdf
+
+
+def filtrar_industrias(gdf_industrias, sectores=None, municipios=None):
+    # Filtra por sector o municipio sobre la capa ya cargada, sin volver a leer los shapefiles
+    seleccion = pd.Series(True, index=gdf_industrias.index)
+    if sectores is not None:
+        seleccion &= gdf_industrias['sector'].isin(sectores)
+    if municipios is not None:
+        seleccion &= gdf_industrias['municipio'].isin(municipios)
+    return gdf_industrias[seleccion]
+
+
+def _parametros_extension(extension):
+    if extension is None:
+        return None
+    return {'bbox': [round(float(v), 3) for v in extension.total_bounds], 'crs': extension.crs.to_string() if extension.crs else None}
+
+
+def _nombre_cache(capa, epsg, gdf_cienegas, margen):
+    # Un archivo de caché por margen de recorte: cambiar de margen no invalida la caché de los demás
+    return f"{capa}_{epsg}" if gdf_cienegas is None else f"{capa}_{epsg}_m{margen:g}"
+
+
+def cargar_industrias(rutas=RUTAS_INDUSTRIAS, epsg=3857, gdf_cienegas=None, margen=UMBRAL_INDUSTRIAS,
+                      directorio=DIRECTORIO_CACHE):
+    # Con gdf_cienegas solo se leen las industrias dentro del radio de influencia industrial
+    extension = extension_influencia(gdf_cienegas, margen) if gdf_cienegas is not None else None
+    return cargar_con_cache(_nombre_cache("industrias", epsg, gdf_cienegas, margen), list(rutas.values()),
+                            lambda: leer_industrias(rutas, epsg, extension),
+                            {'epsg': epsg, 'capas': list(rutas), 'extension': _parametros_extension(extension)},
+                            directorio)
+
+
+def cargar_carreteras(ruta=RUTA_CARRETERAS, epsg=3857, gdf_cienegas=None, margen=UMBRAL_CARRETERAS):
+    extension = extension_influencia(gdf_cienegas, margen) if gdf_cienegas is not None else None
+    return cargar_con_cache(_nombre_cache("carreteras", epsg, gdf_cienegas, margen), [ruta], lambda: leer_capa(ruta, epsg, extension),
+                            {'epsg': epsg, 'extension': _parametros_extension(extension)})
+
+
+def cargar_cienegas(ruta=RUTA_CIENEGAS, epsg=3857):
+    # epsg=None conserva el sistema de referencia original del shapefile
+    nombre = f"cienegas_{epsg}" if epsg is not None else "cienegas_original"
+    return cargar_con_cache(nombre, [ruta], lambda: leer_capa(ruta, epsg), {'epsg': epsg})
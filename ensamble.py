@@ -0,0 +1,116 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from almacen_puntos import contar_puntos, pesos_fuente
+from densidad import MallaDensidad, bordes_malla
+from motor_simulacion import MotorMicroplasticos
+
+Z_95 = 1.959963984540054  # Cuantil normal para intervalos de confianza del 95%
+
+_motor = None  # Motor propio de cada proceso trabajador
+
+
+def _iniciar_trabajador(gdf_cienegas, gdf_industrias, gdf_carreteras, modo_distancias, resolucion_campos):
+    # Las capas llegan una sola vez por proceso; los índices espaciales se construyen aquí
+    global _motor
+    _motor = MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras, modo_distancias, resolucion_campos)
+
+
+def _semilla_de_ano(semilla, ano):
+    # Hija fija por año de la secuencia de la réplica: no depende del orden en que se simulen los años
+    return np.random.SeedSequence(semilla.entropy, spawn_key=semilla.spawn_key + (ano,))
+
+
+def _ejecutar_replica(tarea):
+    semilla, anos, bordes_x, bordes_y = tarea
+    malla = MallaDensidad(bordes_x, bordes_y)
+    mallas = np.zeros((len(anos),) + malla.forma, dtype=np.float64)
+    conteos = np.zeros(len(anos), dtype=np.int64)
+    for i, ano in enumerate(anos):
+        rng = np.random.default_rng(_semilla_de_ano(semilla, ano))
+        x, y, fuente = _motor.dispersar(_motor.puntos_del_ano(ano), rng)
+        mallas[i] = malla.histograma(x, y, pesos_fuente(fuente))
+        conteos[i] = contar_puntos(fuente)
+    return mallas, conteos
+
+
+class ResultadoEnsamble:
+    def __init__(self, anos, bordes_x, bordes_y):
+        self.anos = list(anos)
+        self.bordes_x = bordes_x
+        self.bordes_y = bordes_y
+        forma = (len(self.anos), len(bordes_y) - 1, len(bordes_x) - 1)
+        # Media y varianza por celda acumuladas en línea (Welford): no se guardan las réplicas
+        self.n = 0
+        self.media = np.zeros(forma)
+        self._m2 = np.zeros(forma)
+        self.conteos = []  # Una fila de conteos por año para cada réplica
+
+    def agregar(self, mallas, conteos):
+        self.n += 1
+        delta = mallas - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (mallas - self.media)
+        self.conteos.append(conteos)
+
+    @property
+    def desviacion(self):
+        if self.n < 2:
+            return np.zeros_like(self.media)
+        return np.sqrt(self._m2 / (self.n - 1))
+
+    def intervalo_media(self):
+        # Intervalo de confianza del 95% de la media por celda: mide qué tan bien se conoce la media y se
+        # estrecha al agregar réplicas. No es la dispersión entre réplicas (esa es la desviación por celda)
+        margen = Z_95 * self.desviacion / np.sqrt(max(self.n, 1))
+        return np.maximum(self.media - margen, 0), self.media + margen
+
+    def tabla_conteos(self):
+        # Las dos bandas con nombres distintos: el IC de la media y los percentiles de las réplicas
+        conteos = np.asarray(self.conteos)
+        desviacion = conteos.std(axis=0, ddof=1) if self.n > 1 else np.zeros(len(self.anos))
+        media = conteos.mean(axis=0)
+        margen = Z_95 * desviacion / np.sqrt(max(self.n, 1))
+        return pd.DataFrame({
+            'año': self.anos,
+            'media': media,
+            'desviacion': desviacion,
+            'ic95_media_inferior': np.maximum(media - margen, 0),
+            'ic95_media_superior': media + margen,
+            'replicas_p2_5': np.percentile(conteos, 2.5, axis=0),
+            'replicas_p97_5': np.percentile(conteos, 97.5, axis=0),
+        })
+
+    def guardar(self, directorio):
+        os.makedirs(directorio, exist_ok=True)
+        inferior, superior = self.intervalo_media()
+        np.savez_compressed(os.path.join(directorio, "ensamble_mallas.npz"), anos=np.asarray(self.anos),
+                            bordes_x=self.bordes_x, bordes_y=self.bordes_y, media=self.media,
+                            desviacion=self.desviacion, ic95_media_inferior=inferior, ic95_media_superior=superior,
+                            replicas=self.n)
+        self.tabla_conteos().to_csv(os.path.join(directorio, "ensamble_conteos.csv"), index=False)
+
+
+def ejecutar_ensamble(gdf_industrias, gdf_carreteras, gdf_cienegas, n_replicas, anos, semilla=None,
+                      resolucion=250, procesos=None, modo_distancias='exacto', resolucion_campos=50):
+    # Secuencias independientes por réplica derivadas de una sola semilla maestra
+    semillas = np.random.SeedSequence(semilla).spawn(n_replicas)
+    bordes_x, bordes_y = bordes_malla(gdf_cienegas, resolucion)
+    resultado = ResultadoEnsamble(anos, bordes_x, bordes_y)
+
+    if modo_distancias == 'raster':
+        # Los campos se calculan una vez aquí para que los trabajadores solo los lean del disco
+        MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras, modo_distancias, resolucion_campos).obtener_proximidad()
+
+    tareas = [(s, list(anos), bordes_x, bordes_y) for s in semillas]
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), initializer=_iniciar_trabajador,
+                             initargs=(gdf_cienegas, gdf_industrias, gdf_carreteras,
+                                       modo_distancias, resolucion_campos)) as pool:
+        for i, (mallas, conteos) in enumerate(pool.map(_ejecutar_replica, tareas), start=1):
+            resultado.agregar(mallas, conteos)
+            print(f"Réplica {i}/{n_replicas} completada.")
+
+    return resultado
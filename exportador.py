@@ -0,0 +1,122 @@
+import glob
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import CRS
+
+from almacen_puntos import FUENTE_CARRETERA, FUENTE_INDUSTRIA
+
+TAM_GRUPO = 65_536  # Filas por row group: la unidad mínima que se lee al filtrar por extensión
+FORMATOS = ('parquet', 'fgb')
+
+
+def _metadatos_geo(crs, tipos_geometria):
+    # GeoParquet 1.1 con columna 'bbox' de cobertura, que permite filtrar por extensión sin leer geometrías
+    columna = {'encoding': 'WKB', 'geometry_types': list(tipos_geometria),
+               'covering': {'bbox': {'xmin': ['bbox', 'xmin'], 'ymin': ['bbox', 'ymin'],
+                                     'xmax': ['bbox', 'xmax'], 'ymax': ['bbox', 'ymax']}}}
+    if crs is not None:
+        columna['crs'] = crs.to_json_dict()
+    return {b'geo': json.dumps({'version': '1.1.0', 'primary_column': 'geometry',
+                                'columns': {'geometry': columna}}).encode()}
+
+
+class ExportadorGeo:
+    # Escribe un bloque por año en cuanto se produce; nunca se juntan todos los años en memoria.
+    # GeoParquet: un solo archivo con row groups ordenados espacialmente dentro de cada año.
+    # FlatGeobuf: un archivo con índice espacial por año, porque el formato no admite añadir filas.
+    def __init__(self, ruta, crs, tipos_geometria=(), extension=None):
+        base, formato = os.path.splitext(ruta)
+        self.formato = formato.lstrip('.')
+        if self.formato not in FORMATOS:
+            raise ValueError(f"Formato de exportación no soportado: {formato} (use .parquet o .fgb)")
+        self.ruta = ruta
+        self._base = base
+        self.crs = CRS.from_user_input(crs) if crs is not None else None
+        self.tipos_geometria = tipos_geometria
+        self.extension = extension  # Extensión fija para que el orden de Hilbert sea el mismo en todos los años
+        self._escritor = None
+        self.filas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def ruta_ano(self, ano):
+        return self.ruta if self.formato == 'parquet' else f"{self._base}_{ano}.fgb"
+
+    def _ordenar(self, geometrias):
+        # Geometrías cercanas quedan en el mismo row group y las estadísticas de 'bbox' descartan el resto
+        distancias = gpd.GeoSeries(geometrias).hilbert_distance(total_bounds=self.extension)
+        return np.argsort(distancias.to_numpy(), kind='stable')
+
+    def escribir(self, ano, geometrias, **columnas):
+        geometrias = np.asarray(geometrias, dtype=object)
+        if len(geometrias) == 0:
+            return
+        orden = self._ordenar(geometrias)
+        geometrias = geometrias[orden]
+        columnas = {'año': np.full(len(geometrias), ano, dtype=np.int16),
+                    **{nombre: np.asarray(valores)[orden] for nombre, valores in columnas.items()}}
+
+        if self.formato == 'fgb':
+            gdf = gpd.GeoDataFrame(columnas, geometry=geometrias, crs=self.crs)
+            gdf.to_file(self.ruta_ano(ano), driver='FlatGeobuf', engine='pyogrio')
+        else:
+            # pyarrow es opcional: solo se importa al escribir GeoParquet
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            limites = shapely.bounds(geometrias)
+            bbox = pa.StructArray.from_arrays([pa.array(limites[:, i]) for i in range(4)],
+                                              names=['xmin', 'ymin', 'xmax', 'ymax'])
+            tabla = pa.table({**{nombre: pa.array(valores) for nombre, valores in columnas.items()},
+                              'bbox': bbox, 'geometry': pa.array(shapely.to_wkb(geometrias), type=pa.binary())})
+            if self._escritor is None:
+                esquema = tabla.schema.with_metadata(_metadatos_geo(self.crs, self.tipos_geometria))
+                self._escritor = pq.ParquetWriter(self.ruta, esquema, compression='zstd')
+            self._escritor.write_table(tabla.cast(self._escritor.schema), row_group_size=TAM_GRUPO)
+        self.filas += len(geometrias)
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+
+
+class ExportadorPuntos(ExportadorGeo):
+    def __init__(self, ruta, crs, extension=None):
+        super().__init__(ruta, crs, ('Point',), extension)
+
+    def escribir_puntos(self, ano, x, y, fuente):
+        fuente = np.asarray(fuente, dtype=np.uint8)
+        self.escribir(ano, shapely.points(x, y), fuente=fuente,
+                      industria=(fuente & FUENTE_INDUSTRIA) > 0, carretera=(fuente & FUENTE_CARRETERA) > 0)
+
+
+class ExportadorPoligonos(ExportadorGeo):
+    def __init__(self, ruta, crs, extension=None):
+        super().__init__(ruta, crs, ('Polygon', 'MultiPolygon'), extension)
+
+    def escribir_gdf(self, ano, gdf):
+        gdf = gdf[~(gdf.geometry.is_empty | gdf.geometry.isna())]
+        self.escribir(ano, gdf.geometry.to_numpy(), area=gdf.geometry.area.to_numpy())
+
+
+def leer_resultados(ruta, bbox=None, anos=None):
+    # bbox = (minx, miny, maxx, maxy) en el CRS del archivo; solo se leen los bloques que lo intersecan
+    base, formato = os.path.splitext(ruta)
+    if formato == '.parquet':
+        filtros = [('año', 'in', list(anos))] if anos is not None else None
+        return gpd.read_parquet(ruta, bbox=bbox, filters=filtros)
+    rutas = sorted(glob.glob(f"{base}_*.fgb")) if anos is None else [f"{base}_{ano}.fgb" for ano in anos]
+    partes = [gpd.read_file(r, bbox=bbox, engine='pyogrio') for r in rutas if os.path.exists(r)]
+    if not partes:
+        return gpd.GeoDataFrame(geometry=[])
+    return gpd.GeoDataFrame(pd.concat(partes, ignore_index=True), crs=partes[0].crs)
@@ -1,70 +1,46 @@
-import geopandas as gpd
 import matplotlib.pyplot as plt
-import contextily as cx
 from matplotlib_scalebar.scalebar import ScaleBar
 import numpy as np
-from shapely.geometry import Polygon, MultiPolygon, GeometryCollection
-from shapely.ops import unary_union
-import pandas as pd
+import queue
+import threading
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.animation import FuncAnimation
 import tkinter as tk
-from tkinter import messagebox
-
-class SimulacionCienegas:
-    def __init__(self):
-        self.ruta_shapefile = r"C:\Users\Pablo\Downloads\Shapesxd\ShapeCienegas.shp"
+from tkinter import filedialog, messagebox
+from capas import RUTA_CIENEGAS, cargar_cienegas
+from motor_simulacion import MotorReduccion
+from sesion import SesionDatos
+import instrumentacion
+from nivel_detalle import CacheNivelesDetalle, CapaNivelDetalle, tamano_pixel
+from mapa_base import FUENTE_OSM, dibujar_mapa_base
+from animacion_offline import exportar_reduccion
+
+class SimulacionCienegas(MotorReduccion):
+    def __init__(self, sesion=None):
+        self.sesion = sesion if sesion is not None else SesionDatos()  # Capas compartidas con las demás ventanas
+        self.ruta_shapefile = RUTA_CIENEGAS
         self.ventana_grafico = None
         self.ani = None
         self.fig = None
         self.ax = None
-
+        self.fotogramas = None
+        self.fuente_mapa_base = FUENTE_OSM  # FUENTE_LOCAL usa MapaCienegas.tif y funciona sin red
+        self.backend_reduccion = 'vectorial'  # 'vectorial' (buffer negativo) o 'raster' (erosión morfológica)
+        self.resolucion_raster = 10  # Tamaño de celda en metros del backend 'raster'
+        self.cola_exportacion = queue.Queue()
+        self.id_revision = None  # Revisión periódica de la exportación programada con after()
+
+    @instrumentacion.medido('carga')
     def cargar_shapefile(self):
         try:
-            return gpd.read_file(self.ruta_shapefile)
+            # CRS original, para medir áreas
+            return self.sesion.obtener(('cienegas_original', self.ruta_shapefile),
+                                       lambda: cargar_cienegas(self.ruta_shapefile, epsg=None))
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo cargar el shapefile: {e}")
             return None
 
-    def calcular_factor_reduccion(self, año):
-        tasa_anual = 0.01  # 1% de reducción anual
-        return 1 - (1 - tasa_anual) ** (año - 2023)
-
-    def reducir_geometria(self, geom, factor, area_total, area_original):
-        if isinstance(geom, Polygon):
-            # Factor de reducción ajustado para áreas pequeñas
-            factor_ajustado = factor * (area_original / geom.area)
-            factor_ajustado = min(factor_ajustado, 0.2)  # Limitar la reducción a un 20% máximo por iteración
-            nueva_geom = geom.buffer(-factor_ajustado * geom.length)
-            if nueva_geom.is_empty or nueva_geom.area <= 0:
-                return None
-            return nueva_geom
-        elif isinstance(geom, MultiPolygon):
-            reduced_polys = [self.reducir_geometria(poly, factor, area_total, area_original) for poly in geom.geoms]
-            return MultiPolygon([poly for poly in reduced_polys if poly is not None])
-        elif isinstance(geom, GeometryCollection):
-            reduced_geoms = [self.reducir_geometria(g, factor, area_total, area_original) for g in geom.geoms]
-            return GeometryCollection([g for g in reduced_geoms if g is not None])
-        else:
-            return geom
-
-    def simular_reduccion(self, gdf, anos=10):
-        area_total = gdf.area.sum()
-        area_original = gdf.area.max()  # Máximo área inicial para el ajuste
-        simulaciones = []
-        for i in range(anos):
-            año_actual = 2023 + i
-            factor = self.calcular_factor_reduccion(año_actual)
-            gdf_reducido = gdf.copy()
-            gdf_reducido['geometry'] = gdf_reducido['geometry'].apply(
-                lambda geom: self.reducir_geometria(geom, factor, area_total, area_original)
-            )
-            # Filtramos geometrías vacías
-            gdf_reducido = gdf_reducido[~gdf_reducido.is_empty]
-            gdf_reducido['año'] = año_actual
-            simulaciones.append(gdf_reducido)
-        return simulaciones
-
+    @instrumentacion.medido('dibujo')
     def visualizar_reduccion(self, gdf_original, simulaciones):
         self.ventana_grafico = tk.Toplevel()
         self.ventana_grafico.title("Simulación de Reducción de las Ciénegas de Lerma")
@@ -78,45 +54,8 @@ class SimulacionCienegas:
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-        gdf_original = gdf_original.to_crs(epsg=3857)
-        simulaciones = [gdf.to_crs(epsg=3857) for gdf in simulaciones]
-
-        minx, miny, maxx, maxy = gdf_original.total_bounds
-        w, h = maxx - minx, maxy - miny
-        self.ax.set_xlim(minx - 0.1*w, maxx + 0.1*w)
-        self.ax.set_ylim(miny - 0.1*h, maxy + 0.1*h)
-
-        scalebar = ScaleBar(dx=1, units="m", location="lower right")
-        self.ax.add_artist(scalebar)
-
-        def update(frame):
-            self.ax.clear()
-            self.ax.set_axis_off()
-            
-            cx.add_basemap(self.ax, source=cx.providers.OpenStreetMap.Mapnik, zoom=13)
-            self.ax.add_artist(scalebar)
-            
-            año_actual = 2023 + frame  # Aseguramos que año_actual siempre esté definido
-            gdf_actual = simulaciones[frame]
-            
-            if not gdf_actual.empty:
-                gdf_original.plot(ax=self.ax, facecolor='none', edgecolor='red', linewidth=2)
-                gdf_actual.plot(ax=self.ax, facecolor='blue', alpha=0.5)
-            
-                area_original = gdf_original.area.sum()
-                area_actual = gdf_actual.area.sum()
-                porcentaje_reduccion = (1 - area_actual / area_original) * 100
-
-                self.ax.set_title(f"Año: {año_actual}\nReducción: {porcentaje_reduccion:.2f}%", fontsize=10)
-            else:
-                self.ax.set_title(f"Año: {año_actual}\nTodas las geometrías se han reducido a cero.", fontsize=10)
-            
-            self.ax.set_xlim(minx - 0.1*w, maxx + 0.1*w)
-            self.ax.set_ylim(miny - 0.1*h, maxy + 0.1*h)
-            
-            return self.ax.collections
-
-        self.ani = FuncAnimation(self.fig, update, frames=len(simulaciones),
+        self.preparar_ejes_reduccion(gdf_original, simulaciones)
+        self.ani = FuncAnimation(self.fig, self.dibujar_cuadro, frames=len(self.fotogramas[1]),
                                  interval=1000, repeat=True, blit=False)
 
         plt.tight_layout()
@@ -127,21 +66,126 @@ class SimulacionCienegas:
         btn_volver = tk.Button(frame_botones, text="Volver al menú", command=self.volver_al_menu)
         btn_volver.pack(side=tk.LEFT, padx=5)
 
+        self.btn_exportar = tk.Button(frame_botones, text="Exportar animación", command=self.exportar_animacion)
+        self.btn_exportar.pack(side=tk.LEFT, padx=5)
+        self.etiqueta_exportacion = tk.Label(frame_botones, text="")
+        self.etiqueta_exportacion.pack(side=tk.LEFT, padx=5)
+
         btn_salir = tk.Button(frame_botones, text="Salir", command=self.salir)
         btn_salir.pack(side=tk.RIGHT, padx=5)
 
         self.ventana_grafico.protocol("WM_DELETE_WINDOW", self.salir)
 
+    def preparar_ejes_reduccion(self, gdf_original, simulaciones):
+        # Solo usa self.ax: los benchmarks lo llaman sobre un lienzo Agg, sin Tk
+        if self.backend_reduccion == 'raster':
+            # Modo raster: cada año se vectoriza y reproyecta solo cuando se muestra
+            gdf_original = gdf_original.to_crs(epsg=3857)
+            simulaciones = simulaciones.reproyectadas(3857)
+        else:
+            # Se reproyecta una sola vez el original y todos los años
+            gdf_original, simulaciones = self.reproyectar(gdf_original, simulaciones, epsg=3857)
+        porcentajes = self.metricas['reduccion_pct'].to_numpy()  # Precalculados en simular_reduccion
+        self.fotogramas = (gdf_original, simulaciones, porcentajes)  # Para exportar sin volver a calcular
+
+        minx, miny, maxx, maxy = gdf_original.total_bounds
+        w, h = maxx - minx, maxy - miny
+        self.limites_vista = (minx - 0.1*w, maxx + 0.1*w, miny - 0.1*h, maxy + 0.1*h)
+        self.ax.set_xlim(*self.limites_vista[:2])
+        self.ax.set_ylim(*self.limites_vista[2:])
+
+        scalebar = ScaleBar(dx=1, units="m", location="lower right")
+        self.ax.add_artist(scalebar)
+        self.ax.set_axis_off()
+
+        # Capas estáticas: el mapa base y el contorno original se dibujan una sola vez
+        dibujar_mapa_base(self.ax, zoom=13, fuente=self.fuente_mapa_base)
+        self.capa_original = CapaNivelDetalle(self.ax, CacheNivelesDetalle(gdf_original.geometry),
+                                              facecolor='none', edgecolor='red', linewidth=2)
+        self.artistas_cuadro = []
+        self.niveles_cuadro = {}  # cuadro -> versiones simplificadas de ese año, calculadas la primera vez que se muestra
+
+    def dibujar_cuadro(self, frame):
+        # Solo se reemplaza la capa del año anterior
+        for artista in self.artistas_cuadro:
+            artista.remove()
+        self.artistas_cuadro.clear()
+
+        _, simulaciones, porcentajes = self.fotogramas
+        año_actual = 2023 + frame  # Aseguramos que año_actual siempre esté definido
+        gdf_actual = simulaciones[frame]
+
+        if not gdf_actual.empty:
+            if frame not in self.niveles_cuadro:
+                self.niveles_cuadro[frame] = CacheNivelesDetalle(gdf_actual.geometry)
+            n_colecciones = len(self.ax.collections)
+            self.niveles_cuadro[frame].geometrias(tamano_pixel(self.ax)).plot(ax=self.ax, facecolor='blue', alpha=0.5)
+            self.artistas_cuadro.extend(self.ax.collections[n_colecciones:])
+
+            porcentaje_reduccion = porcentajes[frame]
+
+            self.ax.set_title(f"Año: {año_actual}\nReducción: {porcentaje_reduccion:.2f}%", fontsize=10)
+        else:
+            self.ax.set_title(f"Año: {año_actual}\nTodas las geometrías se han reducido a cero.", fontsize=10)
+
+        self.ax.set_xlim(*self.limites_vista[:2])
+        self.ax.set_ylim(*self.limites_vista[2:])
+
+        return self.ax.collections
+
+    def exportar_animacion(self):
+        ruta = filedialog.asksaveasfilename(parent=self.ventana_grafico, defaultextension=".mp4",
+                                            filetypes=[("Video MP4", "*.mp4"), ("GIF animado", "*.gif")])
+        if not ruta:
+            return
+        # La ventana sigue respondiendo mientras se exporta, como el precálculo de MicroplasticosTiempo.py
+        self.btn_exportar.config(state=tk.DISABLED)
+        self.etiqueta_exportacion.config(text="Exportando animación...")
+        threading.Thread(target=self.exportar_en_segundo_plano, args=(ruta,), daemon=True).start()
+        self.id_revision = self.ventana_grafico.after(100, self.revisar_exportacion)
+
+    def exportar_en_segundo_plano(self, ruta):
+        # Corre fuera del hilo de Tk: no toca widgets, solo deja el resultado en la cola
+        try:
+            # Los fotogramas se dibujan en paralelo con Agg, fuera de esta ventana
+            exportar_reduccion(*self.fotogramas, ruta, fuente_mapa_base=self.fuente_mapa_base)
+        except Exception as e:
+            self.cola_exportacion.put((ruta, e))
+            return
+        self.cola_exportacion.put((ruta, None))
+
+    def revisar_exportacion(self):
+        try:
+            ruta, error = self.cola_exportacion.get_nowait()
+        except queue.Empty:
+            self.id_revision = self.ventana_grafico.after(100, self.revisar_exportacion)
+            return
+
+        self.id_revision = None
+        self.btn_exportar.config(state=tk.NORMAL)
+        self.etiqueta_exportacion.config(text="")
+        if error is None:
+            messagebox.showinfo("Animación exportada", f"Animación guardada en {ruta}", parent=self.ventana_grafico)
+        else:
+            messagebox.showerror("Error", f"No se pudo exportar la animación: {error}", parent=self.ventana_grafico)
+
+    def cancelar_revision(self):
+        if self.id_revision is not None:
+            self.ventana_grafico.after_cancel(self.id_revision)
+            self.id_revision = None
+
     def volver_al_menu(self):
         if self.ani:
             self.ani.event_source.stop()
         if self.ventana_grafico:
+            self.cancelar_revision()
             self.ventana_grafico.destroy()
 
     def salir(self):
         if self.ani:
             self.ani.event_source.stop()
         if self.ventana_grafico:
+            self.cancelar_revision()
             self.ventana_grafico.quit()
             self.ventana_grafico.destroy()
         if self.fig:
@@ -150,7 +194,13 @@ class SimulacionCienegas:
     def ejecutar_simulacion_reduccion(self):
         gdf_original = self.cargar_shapefile()
         if gdf_original is not None:
-            simulaciones = self.simular_reduccion(gdf_original)
+            if self.backend_reduccion == 'raster':
+                from reduccion_raster import ReduccionRaster  # Requiere scipy; el backend vectorial no
+                reduccion = ReduccionRaster(self.resolucion_raster)
+                simulaciones = reduccion.simular_reduccion(gdf_original)
+                self.metricas = reduccion.metricas
+            else:
+                simulaciones = self.simular_reduccion(gdf_original)
             self.visualizar_reduccion(gdf_original, simulaciones)
 
 if __name__ == "__main__":
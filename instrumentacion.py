@@ -0,0 +1,169 @@
+import atexit
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# Temporizadores, contadores y memoria pico por fase. Desactivada no cuesta más que una comparación.
+# Se activa en tiempo de ejecución con activar() o con la variable de entorno CIENEGAS_PERFIL=ruta.json
+# (ruta terminada en .trace.json: formato Chrome trace, abrible en chrome://tracing o Perfetto).
+
+VARIABLE_ENTORNO = 'CIENEGAS_PERFIL'
+
+_activa = False
+_memoria = False
+_ruta = None
+_inicio_ns = 0
+_eventos = []  # (nombre, hilo, inicio_ns, duración_ns, memoria pico en bytes o None)
+_contadores = {}
+_candado = threading.Lock()
+_nulo = nullcontext()
+_abiertas = {}  # hilo -> fases abiertas de ese hilo, cada una [pico válido]
+
+
+def activa():
+    return _activa
+
+
+def activar(ruta=None, memoria=True):
+    # memoria=True usa tracemalloc: mide el pico de cada fase, pero hace más lento el código de Python
+    global _activa, _memoria, _ruta, _inicio_ns
+    with _candado:
+        _eventos.clear()
+        _contadores.clear()
+    _ruta = ruta
+    _memoria = memoria
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _inicio_ns = time.perf_counter_ns()
+    _activa = True
+
+
+def desactivar(volcar_resultados=True):
+    global _activa
+    if not _activa:
+        return None
+    _activa = False
+    ruta = volcar(_ruta) if volcar_resultados and _ruta else None
+    if _memoria and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return ruta
+
+
+def contar(nombre, n=1):
+    if _activa:
+        with _candado:
+            _contadores[nombre] = _contadores.get(nombre, 0) + int(n)
+
+
+def _abrir_fase(hilo):
+    # El pico de tracemalloc es global al proceso: se reinicia al entrar y se lee al salir de la fase.
+    # En fases anidadas, el pico de la externa cuenta desde el inicio de la última interna.
+    # Si otro hilo tiene una fase abierta (p. ej. el precálculo de MicroplasticosTiempo.py), el pico
+    # compartido no es de ninguna de las dos: no se reinicia y ambas se guardan sin memoria.
+    fase = [True]
+    with _candado:
+        concurrentes = [f for h, fases in _abiertas.items() if h != hilo for f in fases]
+        if concurrentes:
+            fase[0] = False
+            for f in concurrentes:
+                f[0] = False
+        else:
+            tracemalloc.reset_peak()
+        _abiertas.setdefault(hilo, []).append(fase)
+    return fase
+
+
+def _cerrar_fase(hilo, fase):
+    with _candado:
+        pico = tracemalloc.get_traced_memory()[1] if fase[0] and tracemalloc.is_tracing() else None
+        fases = _abiertas[hilo]
+        fases.pop()  # Las fases de un mismo hilo se cierran en orden inverso
+        if not fases:
+            del _abiertas[hilo]
+    return pico
+
+
+@contextmanager
+def _medir(nombre):
+    hilo = threading.get_ident()
+    fase = _abrir_fase(hilo) if _memoria else None
+    inicio = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter_ns() - inicio
+        pico = _cerrar_fase(hilo, fase) if fase is not None else None
+        with _candado:
+            _eventos.append((nombre, hilo, inicio - _inicio_ns, duracion, pico))
+
+
+def fase(nombre):
+    return _medir(nombre) if _activa else _nulo
+
+
+def medido(nombre):
+    # Decorador equivalente a envolver la función en fase(nombre)
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activa:
+                return funcion(*args, **kwargs)
+            with _medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def resumen():
+    fases = {}
+    with _candado:
+        eventos = list(_eventos)
+        contadores = dict(_contadores)
+    for nombre, _, _, duracion, pico in eventos:
+        f = fases.setdefault(nombre, {'llamadas': 0, 'total_s': 0.0, 'max_s': 0.0, 'memoria_pico': None})
+        f['llamadas'] += 1
+        f['total_s'] += duracion / 1e9
+        f['max_s'] = max(f['max_s'], duracion / 1e9)
+        if pico is not None:
+            f['memoria_pico'] = max(f['memoria_pico'] or 0, pico)
+    return {'fases': fases, 'contadores': contadores,
+            'memoria_pico': tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None}
+
+
+def _traza_chrome():
+    pid = os.getpid()
+    with _candado:
+        eventos = list(_eventos)
+        contadores = dict(_contadores)
+    traza = [{'name': nombre, 'ph': 'X', 'ts': inicio / 1e3, 'dur': duracion / 1e3, 'pid': pid, 'tid': hilo,
+              'args': {} if pico is None else {'memoria_pico': pico}}
+             for nombre, hilo, inicio, duracion, pico in eventos]
+    fin = max((e['ts'] + e['dur'] for e in traza), default=0)
+    traza += [{'name': nombre, 'ph': 'C', 'ts': fin, 'pid': pid, 'args': {'valor': valor}}
+              for nombre, valor in contadores.items()]
+    return {'traceEvents': traza, 'displayTimeUnit': 'ms'}
+
+
+def volcar(ruta):
+    datos = _traza_chrome() if ruta.endswith('.trace.json') else resumen()
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=1)
+    print(f"Perfil guardado en {ruta}")
+    return ruta
+
+
+if os.environ.get(VARIABLE_ENTORNO):
+    # Un archivo por corrida: el PID evita que dos ventanas o procesos se pisen
+    _base, _extension = os.environ[VARIABLE_ENTORNO], ''
+    for _sufijo in ('.trace.json', '.json'):
+        if _base.endswith(_sufijo):
+            _base, _extension = _base[:-len(_sufijo)], _sufijo
+            break
+    activar(f"{_base}_{os.getpid()}{_extension or '.json'}")
+    atexit.register(desactivar)
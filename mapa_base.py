@@ -0,0 +1,85 @@
+import hashlib
+import os
+
+import contextily as cx
+import numpy as np
+import rasterio
+
+import instrumentacion
+
+DIRECTORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_TESELAS = os.path.join(DIRECTORIO_BASE, ".cache_teselas")
+RUTA_MAPA_LOCAL = os.path.join(DIRECTORIO_BASE, "MapaCienegas.tif")
+
+FUENTE_OSM = 'osm'  # Teselas de OpenStreetMap con caché persistente en disco
+FUENTE_LOCAL = 'local'  # MapaCienegas.tif, funciona sin red
+
+_imagenes = {}  # Fondos ya cargados en esta sesión
+_cache_teselas_lista = False
+
+
+def _preparar_cache_teselas():
+    # Las teselas descargadas por contextily se conservan entre ejecuciones; el directorio se crea al primer uso
+    global _cache_teselas_lista
+    if not _cache_teselas_lista:
+        os.makedirs(DIRECTORIO_TESELAS, exist_ok=True)
+        cx.set_cache_dir(DIRECTORIO_TESELAS)
+        _cache_teselas_lista = True
+
+
+@instrumentacion.medido('mapa_base')
+def _leer_mapa_local(ruta=RUTA_MAPA_LOCAL):
+    with rasterio.open(ruta) as src:
+        img, transform = src.read(), src.transform
+        if src.crs is not None and src.crs.to_epsg() != 3857:
+            img, transform = cx.warp_img_transform(img, transform, src.crs, 'EPSG:3857')
+
+    img = np.moveaxis(img, 0, -1)  # (bandas, filas, columnas) -> (filas, columnas, bandas)
+    if img.shape[-1] == 1:
+        img = img[..., 0]
+    filas, columnas = img.shape[:2]
+    izquierda, arriba = transform.c, transform.f
+    derecha = izquierda + transform.a * columnas
+    abajo = arriba + transform.e * filas
+    return img, (izquierda, derecha, abajo, arriba)
+
+
+@instrumentacion.medido('mapa_base')
+def _descargar_fondo(limites, zoom):
+    # Ensambla el fondo una sola vez para la extensión fija y lo guarda ya renderizado
+    clave = hashlib.sha1(repr((tuple(round(v, 1) for v in limites), zoom)).encode()).hexdigest()[:16]
+    ruta = os.path.join(DIRECTORIO_TESELAS, f"fondo_{clave}.npz")
+    if os.path.exists(ruta):
+        with np.load(ruta) as datos:
+            return datos['img'], tuple(datos['extension'])
+
+    _preparar_cache_teselas()
+    xmin, xmax, ymin, ymax = limites
+    img, extension = cx.bounds2img(xmin, ymin, xmax, ymax, zoom=zoom,
+                                   source=cx.providers.OpenStreetMap.Mapnik, ll=False)
+    np.savez_compressed(ruta, img=img, extension=np.asarray(extension))
+    return img, tuple(extension)
+
+
+def obtener_fondo(limites, zoom=12, fuente=FUENTE_OSM):
+    clave = (fuente, zoom, tuple(round(v, 1) for v in limites))
+    if clave not in _imagenes:
+        if fuente == FUENTE_OSM:
+            try:
+                _imagenes[clave] = _descargar_fondo(limites, zoom)
+            except Exception as e:
+                # Sin red ni fondo guardado: usamos el mapa georreferenciado del repositorio
+                print(f"No se pudo obtener el mapa base de OpenStreetMap ({e}); se usa {os.path.basename(RUTA_MAPA_LOCAL)}.")
+                _imagenes[clave] = _leer_mapa_local()
+        else:
+            _imagenes[clave] = _leer_mapa_local()
+    return _imagenes[clave]
+
+
+def dibujar_mapa_base(ax, zoom=12, fuente=FUENTE_OSM):
+    # Dibuja el fondo como una imagen estática bajo las demás capas, sin cambiar la vista
+    limites = ax.axis()
+    img, extension = obtener_fondo(limites, zoom, fuente)
+    artista = ax.imshow(img, extent=extension, zorder=0, interpolation='bilinear')
+    ax.axis(limites)
+    return artista
@@ -0,0 +1,145 @@
+import argparse
+import glob
+import os
+import re
+import sys
+
+import folium
+import numpy as np
+from folium import plugins
+from pyproj import Transformer
+
+from almacen_puntos import pesos_fuente
+from capas import RUTA_CIENEGAS, agregar_argumentos_datos, cargar_cienegas, rutas_de_argumentos
+from densidad import MallaDensidad
+from exportador import leer_resultados
+
+# Genera el mapa interactivo a partir de los resultados de simular.py, p. ej.:
+#   python simular.py reduccion --formato parquet --salida resultados
+#   python simular.py tiempo --formato parquet --salida resultados
+#   python mapa_interactivo.py resultados --acumulado --salida mapa_interactivo_cienegas_lerma.html
+#   python mapa_interactivo.py resultados --datos /datos/cienegas
+
+CENTRO = (19.25, -99.5)  # Ciénegas de Lerma, como en el mapa original
+MAX_MARCADORES = 20_000  # Muestra del último año para la capa de marcadores agrupados
+
+
+def _fecha(ano):
+    return f"{ano}-01-01"
+
+
+def _archivo_serie(directorio, nombre):
+    for formato in ('parquet', 'fgb'):
+        ruta = os.path.join(directorio, f"{nombre}.{formato}")
+        if os.path.exists(ruta) or glob.glob(os.path.join(directorio, f"{nombre}_*.{formato}")):
+            return ruta
+    return None
+
+
+def _anos_disponibles(ruta):
+    if ruta.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return sorted(set(pq.read_table(ruta, columns=['año']).column('año').to_pylist()))
+    base = os.path.splitext(ruta)[0]
+    return sorted(int(re.search(r'_(\d+)\.fgb$', r).group(1)) for r in glob.glob(f"{base}_*.fgb"))
+
+
+def capa_reduccion(gdf_por_ano, tolerancia=5.0):
+    # Polígonos por año en una sola capa con control temporal; se simplifican en metros antes de pasar a grados
+    caracteristicas = []
+    for ano, gdf in gdf_por_ano:
+        if gdf.empty:
+            continue
+        geometrias = gdf.geometry.simplify(tolerancia, preserve_topology=True).to_crs(epsg=4326)
+        for geometria in geometrias:
+            caracteristicas.append({
+                'type': 'Feature',
+                'geometry': geometria.__geo_interface__,
+                'properties': {'times': [_fecha(ano)], 'popup': f"Ciénegas {ano}",
+                               'style': {'color': 'blue', 'weight': 1, 'fillColor': 'blue', 'fillOpacity': 0.4}},
+            })
+    return plugins.TimestampedGeoJson({'type': 'FeatureCollection', 'features': caracteristicas},
+                                      period='P1Y', duration='P1Y', add_last_point=False, auto_play=False,
+                                      loop=False, date_options='YYYY', time_slider_drag_update=True)
+
+
+def capa_microplasticos(malla, anos, crs, acumulado=True):
+    # Cada cuadro del control es la malla agregada del año: el navegador recibe celdas, no partículas
+    transformador = Transformer.from_crs(crs, 4326, always_xy=True)
+    centros_x = (malla.bordes_x[:-1] + malla.bordes_x[1:]) / 2
+    centros_y = (malla.bordes_y[:-1] + malla.bordes_y[1:]) / 2
+    lon, lat = transformador.transform(*np.meshgrid(centros_x, centros_y))
+
+    cuadros = []
+    maximo = 0.0
+    for ano in anos:
+        conteo = malla.hasta_ano(ano) if acumulado else malla.mallas.get(ano, np.zeros(malla.forma))
+        filas, columnas = np.nonzero(conteo)
+        maximo = max(maximo, float(conteo.max()) if conteo.size else 0.0)
+        cuadros.append(np.column_stack([lat[filas, columnas], lon[filas, columnas], conteo[filas, columnas]]))
+    # Pesos normalizados a [0, 1] con el máximo de toda la serie, para que los años sean comparables
+    datos = [(c * [1, 1, 1 / maximo] if maximo else c).round(6).tolist() for c in cuadros]
+    return plugins.HeatMapWithTime(datos, index=[str(a) for a in anos], name="Microplásticos",
+                                   radius=12, auto_play=False, max_opacity=0.8, use_local_extrema=False)
+
+
+def generar_mapa(directorio, salida, celda=250, acumulado=True, tolerancia=5.0, ruta_cienegas=RUTA_CIENEGAS):
+    mapa = folium.Map(location=CENTRO, zoom_start=12, tiles='OpenStreetMap')
+
+    gdf_cienegas = cargar_cienegas(ruta_cienegas)
+    folium.GeoJson(gdf_cienegas.geometry.simplify(tolerancia, preserve_topology=True).to_crs(epsg=4326),
+                   name="Ciénegas actuales",
+                   style_function=lambda _: {'color': 'black', 'weight': 1, 'fillOpacity': 0}).add_to(mapa)
+
+    ruta_reduccion = _archivo_serie(directorio, 'reduccion')
+    if ruta_reduccion:
+        # Un año a la vez: la lectura filtra por año y el resto nunca está en memoria
+        anos = _anos_disponibles(ruta_reduccion)
+        capa_reduccion(((ano, leer_resultados(ruta_reduccion, anos=[ano])) for ano in anos),
+                       tolerancia).add_to(mapa)
+
+    ruta_puntos = _archivo_serie(directorio, 'microplasticos')
+    if ruta_puntos:
+        anos = _anos_disponibles(ruta_puntos)
+        malla = MallaDensidad.desde_cienegas(gdf_cienegas, celda)
+        ultimo = None
+        for ano in anos:
+            puntos = leer_resultados(ruta_puntos, anos=[ano]).to_crs(gdf_cienegas.crs)
+            fuente = puntos['fuente'].to_numpy()
+            malla.mallas[ano] = malla.histograma(puntos.geometry.x, puntos.geometry.y, pesos_fuente(fuente))
+            ultimo = puntos
+        capa_microplasticos(malla, anos, gdf_cienegas.crs, acumulado).add_to(mapa)
+
+        # Marcadores agrupados con una muestra acotada del último año, para inspeccionar puntos concretos
+        if ultimo is not None and len(ultimo):
+            muestra = ultimo.sample(min(len(ultimo), MAX_MARCADORES), random_state=0).to_crs(epsg=4326)
+            grupo = plugins.FastMarkerCluster(np.column_stack([muestra.geometry.y, muestra.geometry.x]).tolist(),
+                                              name=f"Puntos {anos[-1]} (muestra)", show=False)
+            grupo.add_to(mapa)
+
+    folium.LayerControl().add_to(mapa)
+    mapa.save(salida)
+    return mapa
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mapa interactivo de una corrida de simular.py")
+    parser.add_argument('directorio', help="Directorio de resultados con salida --formato parquet o fgb")
+    parser.add_argument('--salida', default='mapa_interactivo_cienegas_lerma.html')
+    parser.add_argument('--celda', type=float, default=250, help="Celda en metros para agregar los puntos")
+    parser.add_argument('--acumulado', action='store_true', help="Cada año muestra los puntos acumulados hasta él")
+    parser.add_argument('--tolerancia', type=float, default=5.0, help="Simplificación de polígonos en metros")
+    agregar_argumentos_datos(parser)
+    args = parser.parse_args(argv)
+
+    if not (_archivo_serie(args.directorio, 'reduccion') or _archivo_serie(args.directorio, 'microplasticos')):
+        print(f"Error: {args.directorio} no contiene reduccion.* ni microplasticos.* (parquet o fgb)", file=sys.stderr)
+        return 2
+    generar_mapa(args.directorio, args.salida, args.celda, args.acumulado, args.tolerancia,
+                 rutas_de_argumentos(args)[2])
+    print(f"Mapa guardado en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,55 @@
-import geopandas as gpd
-import pandas as pd  # Importar pandas para la concatenación de GeoDataFrames
 import matplotlib.pyplot as plt
-import contextily as cx
 from matplotlib_scalebar.scalebar import ScaleBar
 import numpy as np
-import random
-from shapely.geometry import Point
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 from tkinter import messagebox
+from capas import RUTAS_INDUSTRIAS, RUTA_CARRETERAS, RUTA_CIENEGAS, cargar_industrias, cargar_carreteras, cargar_cienegas
+from almacen_puntos import AlmacenPuntos
+from densidad import MallaDensidad
+from nivel_detalle import CacheNivelesDetalle, CapaNivelDetalle
+from mapa_base import FUENTE_OSM, dibujar_mapa_base
+from motor_simulacion import MotorMicroplasticos
+from sesion import SesionDatos
+import instrumentacion
 
 class SimulacionMicroplasticos:
-    def __init__(self, master):
+    def __init__(self, master, sesion=None):
         self.master = master
-        self.ruta_industrias = {
-            'Lerma_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Apoyo\ApoyoLerma.shp",
-            'Lerma_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Constructoras\ConstructorasLerma.shp",
-            'Lerma_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Manufactureras\ManufaLerma.shp",
-            'Lerma_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Lerma\Transporte\TransporteLerma.shp",
-            'Ocoyoacac_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Apoyo\ApoyoOco.shp",
-            'Ocoyoacac_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Constructoras\ConstructorasOco.shp",
-            'Ocoyoacac_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Manufactureras\ManuOco.shp",
-            'Ocoyoacac_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\Ocoyoacac\Transporte\TransporteOco.shp",
-            'SanMateo_Apoyo': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Apoyo\ApoyoSanMateo.shp",
-            'SanMateo_Constructoras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Constructoras\ConstructorasSanMateo.shp",
-            'SanMateo_Manufactureras': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Manufactureras\ManuSanMateo.shp",
-            'SanMateo_Transporte': r"C:\Users\Pablo\Downloads\ShapeIndustrias\SanMateo\Transporte\TransporteSanMateo.shp",
-        }
-        self.ruta_carreteras = r"C:\Users\Pablo\Downloads\ShapeIndustrias\CallesCienegas\CallesCienegas.shp"
-        self.ruta_cienegas = r"C:\Users\Pablo\Downloads\Shapesxd\ShapeCienegas.shp"
+        self.sesion = sesion if sesion is not None else SesionDatos()  # Capas compartidas con las demás ventanas
+        self.ruta_industrias = dict(RUTAS_INDUSTRIAS)
+        self.ruta_carreteras = RUTA_CARRETERAS
+        self.ruta_cienegas = RUTA_CIENEGAS
 
         self.ventana_grafico = tk.Toplevel(self.master)  # Creamos una nueva ventana secundaria
         self.ventana_grafico.title("Simulación de Microplásticos en las Ciénegas de Lerma")
         self.ventana_grafico.geometry("800x700")
         self.fig = None
         self.ax = None
+        self.motor = None
+        self.modo_visualizacion = 'puntos'  # 'puntos' o 'densidad' (malla acumulada, memoria constante)
+        self.resolucion_densidad = 100  # Tamaño de celda en metros del modo 'densidad'
+        self.fuente_mapa_base = FUENTE_OSM  # FUENTE_LOCAL usa MapaCienegas.tif y funciona sin red
+        self.modo_distancias = 'exacto'  # 'exacto' (índice espacial) o 'raster' (campos precalculados)
+        self.resolucion_campos = 50  # Tamaño de celda en metros del modo 'raster'
 
-        self.ventana_grafico.protocol("WM_DELETE_WINDOW", self.salir)
+        self.ventana_grafico.protocol("WM_DELETE_WINDOW", self.volver_al_menu)
 
+    @instrumentacion.medido('carga')
     def cargar_shapefiles(self):
-        # Cargar las industrias
+        # Cargar las ciénegas (primero, porque su extensión acota la lectura de las demás capas)
         try:
-            industrias = [gpd.read_file(shp).to_crs(epsg=3857) for shp in self.ruta_industrias.values()]
-            gdf_industrias = gpd.GeoDataFrame(pd.concat(industrias, ignore_index=True))
+            gdf_cienegas = self.sesion.obtener(('cienegas', self.ruta_cienegas), lambda: cargar_cienegas(self.ruta_cienegas))
+            print("Shapefiles de ciénegas cargados correctamente.")
+        except Exception as e:
+            print(f"Error al cargar ciénegas: {e}")
+            messagebox.showerror("Error", f"Error al cargar ciénegas: {e}")
+            return None, None, None
+
+        # Cargar las industrias dentro del radio de influencia (en paralelo y desde la caché si no cambiaron)
+        try:
+            gdf_industrias = self.sesion.obtener(('industrias', tuple(self.ruta_industrias.values())),
+                                                 lambda: cargar_industrias(self.ruta_industrias, gdf_cienegas=gdf_cienegas))
             print("Shapefiles de industrias cargados correctamente.")
         except Exception as e:
             print(f"Error al cargar industrias: {e}")
@@ -51,66 +58,52 @@ class SimulacionMicroplasticos:
 
         # Cargar las carreteras
         try:
-            gdf_carreteras = gpd.read_file(self.ruta_carreteras).to_crs(epsg=3857)
+            gdf_carreteras = self.sesion.obtener(('carreteras', self.ruta_carreteras),
+                                                 lambda: cargar_carreteras(self.ruta_carreteras, gdf_cienegas=gdf_cienegas))
             print("Shapefiles de carreteras cargados correctamente.")
         except Exception as e:
             print(f"Error al cargar carreteras: {e}")
             messagebox.showerror("Error", f"Error al cargar carreteras: {e}")
             return None, None, None
 
-        # Cargar las ciénegas
-        try:
-            gdf_cienegas = gpd.read_file(self.ruta_cienegas).to_crs(epsg=3857)
-            print("Shapefiles de ciénegas cargados correctamente.")
-        except Exception as e:
-            print(f"Error al cargar ciénegas: {e}")
-            messagebox.showerror("Error", f"Error al cargar ciénegas: {e}")
-            return None, None, None
-
         return gdf_industrias, gdf_carreteras, gdf_cienegas
 
-    def dispersar_microplasticos(self, gdf_cienegas, gdf_industrias, gdf_carreteras):
+    def obtener_niveles(self, gdf_cienegas):
+        # Compartidos por sesión: las versiones simplificadas se calculan una vez por capa
+        return self.sesion.obtener(('niveles', id(gdf_cienegas)), lambda: CacheNivelesDetalle(gdf_cienegas.geometry))
+
+    def obtener_motor(self, gdf_cienegas, gdf_industrias, gdf_carreteras):
+        # El motor (sin interfaz gráfica) conserva los índices espaciales entre llamadas
+        if self.motor is None:
+            # Compartido por sesión: la otra simulación de microplásticos reutiliza sus índices espaciales
+            clave = ('motor', id(gdf_cienegas), id(gdf_industrias), id(gdf_carreteras), self.modo_distancias, self.resolucion_campos)
+            self.motor = self.sesion.obtener(clave, lambda: MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras,
+                                                                                self.modo_distancias, self.resolucion_campos))
+        return self.motor
+
+    @instrumentacion.medido('dispersion')
+    def dispersar_microplasticos(self, gdf_cienegas, gdf_industrias, gdf_carreteras, semilla=None):
         if gdf_cienegas is None or gdf_industrias is None or gdf_carreteras is None:
-            return []
-
-        # Crear una lista para almacenar los puntos de microplásticos
-        puntos_microplasticos = []
+            return AlmacenPuntos()
 
         # Parámetros de simulación
-        num_puntos_inicial = 1000  # Número inicial de puntos de microplásticos
         años = 10  # Número de años de simulación
-        tasa_incremento = 1.1  # Tasa de incremento anual de microplásticos
-
-        # Iterar a lo largo de los años
-        for año in range(años):
-            # Para cada polígono de las ciénegas, añadir puntos de microplásticos
-            for idx, row in gdf_cienegas.iterrows():
-                poligono = row['geometry']
-
-                # Añadir puntos iniciales de microplásticos
-                for _ in range(int(num_puntos_inicial * tasa_incremento ** año)):
-                    # Generar un punto dentro del polígono
-                    minx, miny, maxx, maxy = poligono.bounds
-                    while True:
-                        punto = Point(random.uniform(minx, maxx), random.uniform(miny, maxy))
-                        if poligono.contains(punto):
-                            break
-
-                    # Evaluar la influencia de las industrias y carreteras
-                    dist_industrias = gdf_industrias.distance(punto).min()
-                    dist_carreteras = gdf_carreteras.distance(punto).min()
-
-                    # Incrementar la cantidad de microplásticos según la proximidad
-                    if dist_industrias < 5000:  # 5 km de influencia industrial
-                        puntos_microplasticos.append(punto)
-                    if dist_carreteras < 2000:  # 2 km de influencia de carreteras
-                        puntos_microplasticos.append(punto)
-
-        print(f"Simulación completada: {len(puntos_microplasticos)} puntos generados.")
+
+        motor = self.obtener_motor(gdf_cienegas, gdf_industrias, gdf_carreteras)
+        if self.modo_visualizacion == 'densidad':
+            # Los puntos se suman a una malla por bloques y se descartan: memoria constante
+            puntos_microplasticos = motor.simular_acumulado_densidad(años, semilla=semilla,
+                                                                     resolucion=self.resolucion_densidad)
+        else:
+            # Los puntos de todos los años quedan en un almacén de arreglos (x, y, año, fuente)
+            puntos_microplasticos = motor.simular_acumulado(años, semilla=semilla)
+
+        print(f"Simulación completada: {puntos_microplasticos.conteo()} puntos generados.")
         return puntos_microplasticos
 
+    @instrumentacion.medido('dibujo')
     def mostrar_mapa(self, gdf_cienegas, puntos_microplasticos):
-        if len(puntos_microplasticos) == 0:
+        if puntos_microplasticos.conteo() == 0:
             print("No se generaron puntos de microplásticos.")
             return
 
@@ -122,16 +115,20 @@ class SimulacionMicroplasticos:
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-        # Mostrar las ciénegas
-        gdf_cienegas.plot(ax=self.ax, facecolor='none', edgecolor='blue', linewidth=2)
+        # Mostrar las ciénegas con el nivel de detalle que corresponde al zoom
+        self.capa_cienegas = CapaNivelDetalle(self.ax, self.obtener_niveles(gdf_cienegas),
+                                              facecolor='none', edgecolor='blue', linewidth=2)
 
-        # Añadir los puntos de microplásticos
-        x_vals = [punto.x for punto in puntos_microplasticos]
-        y_vals = [punto.y for punto in puntos_microplasticos]
-        self.ax.scatter(x_vals, y_vals, color='red', s=1, label='Microplásticos')
+        # Añadir los puntos de microplásticos (o su densidad como una sola imagen)
+        if isinstance(puntos_microplasticos, MallaDensidad):
+            imagen = puntos_microplasticos.dibujar(self.ax)
+            self.fig.colorbar(imagen, ax=self.ax, shrink=0.7, label='Microplásticos por celda')
+        else:
+            datos = puntos_microplasticos.datos
+            self.ax.scatter(datos['x'], datos['y'], color='red', s=1, label='Microplásticos')
 
         # Añadir mapa base
-        cx.add_basemap(self.ax, source=cx.providers.OpenStreetMap.Mapnik, zoom=12)
+        dibujar_mapa_base(self.ax, zoom=12, fuente=self.fuente_mapa_base)
 
         # Añadir barra de escala
         scalebar = ScaleBar(1, units="m", location="lower right")
@@ -142,7 +139,7 @@ class SimulacionMicroplasticos:
         frame_botones = tk.Frame(self.ventana_grafico)
         frame_botones.pack(fill=tk.X, padx=10, pady=10)
 
-        btn_volver = tk.Button(frame_botones, text="Volver al menú", command=self.salir)
+        btn_volver = tk.Button(frame_botones, text="Volver al menú", command=self.volver_al_menu)
         btn_volver.pack(side=tk.LEFT, padx=5)
 
         btn_salir = tk.Button(frame_botones, text="Salir", command=self.salir)
@@ -153,6 +150,14 @@ class SimulacionMicroplasticos:
         puntos_microplasticos = self.dispersar_microplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras)
         self.mostrar_mapa(gdf_cienegas, puntos_microplasticos)
 
+    def volver_al_menu(self):
+        # Solo se cierra esta ventana; el menú y las capas de la sesión siguen cargados
+        self.ventana_grafico.destroy()
+        if self.fig:
+            plt.close(self.fig)
+        if self.master.state() == 'withdrawn':  # Ejecutado por separado: no hay menú al que volver
+            self.master.quit()
+
     def salir(self):
         self.master.quit()  # Cierra toda la aplicación, incluyendo la ventana principal (index.py)
 
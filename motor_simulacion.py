@@ -0,0 +1,212 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, GeometryCollection
+
+import instrumentacion
+from almacen_puntos import AlmacenPuntos, banderas_fuente
+from densidad import TAM_BLOQUE, MallaDensidad
+from capas import RUTAS_INDUSTRIAS, RUTA_CARRETERAS, RUTA_CIENEGAS, cargar_industrias, cargar_carreteras, cargar_cienegas
+from muestreo import crear_generador, muestrear_puntos
+from proximidad import UMBRAL_CARRETERAS, UMBRAL_INDUSTRIAS, MotorProximidad
+from campos_distancia import CampoDistancias
+
+ANO_BASE = 2023
+TASA_INCREMENTO = 1.1  # Tasa de incremento anual de microplásticos
+NUM_PUNTOS_INICIAL = 1000  # Número inicial de puntos de microplásticos por polígono
+NUM_PUNTOS_BASE = 10000  # Puntos por polígono del año base en la simulación en el tiempo
+
+
+def cargar_capas(ruta_industrias=RUTAS_INDUSTRIAS, ruta_carreteras=RUTA_CARRETERAS, ruta_cienegas=RUTA_CIENEGAS,
+                 margen_industrias=UMBRAL_INDUSTRIAS, margen_carreteras=UMBRAL_CARRETERAS):
+    # Carga sin interfaz gráfica; los errores se propagan al llamador.
+    # Los márgenes de recorte deben cubrir la mayor distancia que se vaya a consultar.
+    gdf_cienegas = cargar_cienegas(ruta_cienegas)
+    gdf_industrias = cargar_industrias(ruta_industrias, gdf_cienegas=gdf_cienegas, margen=margen_industrias)
+    gdf_carreteras = cargar_carreteras(ruta_carreteras, gdf_cienegas=gdf_cienegas, margen=margen_carreteras)
+    return gdf_industrias, gdf_carreteras, gdf_cienegas
+
+
+def semilla_de_ano(semilla, ano):
+    # Cada año tiene su propia semilla derivada: se pueden repartir años entre procesos sin perder reproducibilidad
+    return None if semilla is None else [semilla, ano]
+
+
+class MotorMicroplasticos:
+    def __init__(self, gdf_cienegas, gdf_industrias, gdf_carreteras,
+                 modo_distancias='exacto', resolucion_campos=50, tasa_incremento=TASA_INCREMENTO):
+        self.gdf_cienegas = gdf_cienegas
+        self.gdf_industrias = gdf_industrias
+        self.gdf_carreteras = gdf_carreteras
+        self.modo_distancias = modo_distancias  # 'exacto' (índice espacial) o 'raster' (campos precalculados)
+        self.resolucion_campos = resolucion_campos  # Tamaño de celda en metros del modo 'raster'
+        self.tasa_incremento = tasa_incremento
+        self.proximidad = None
+
+    def obtener_proximidad(self):
+        # Los índices espaciales se construyen una sola vez y se reutilizan en todos los años
+        if self.proximidad is None:
+            with instrumentacion.fase('indices_espaciales'):
+                self.proximidad = MotorProximidad(self.gdf_industrias, self.gdf_carreteras)
+                if self.modo_distancias == 'raster':
+                    # Campos de distancia precalculados: cada punto se clasifica indexando un arreglo
+                    self.proximidad = CampoDistancias(self.gdf_cienegas, self.proximidad, self.resolucion_campos)
+        return self.proximidad
+
+    def puntos_por_poligono(self, num_puntos_inicial, anos_transcurridos):
+        return int(num_puntos_inicial * self.tasa_incremento ** anos_transcurridos)
+
+    def muestrear(self, n_por_poligono, semilla=None):
+        # Devuelve las coordenadas muestreadas y las máscaras de influencia industrial y de carreteras
+        with instrumentacion.fase('muestreo'):
+            x, y = muestrear_puntos(self.gdf_cienegas.geometry, n_por_poligono, semilla)
+        proximidad = self.obtener_proximidad()
+        with instrumentacion.fase('clasificacion'):
+            cerca_industrias, cerca_carreteras = proximidad.clasificar(x, y)
+        return x, y, cerca_industrias, cerca_carreteras
+
+    def dispersar(self, n_por_poligono, semilla=None):
+        # Devuelve solo los puntos con alguna fuente cercana, con sus banderas de fuente
+        x, y, cerca_industrias, cerca_carreteras = self.muestrear(n_por_poligono, semilla)
+        fuente = banderas_fuente(cerca_industrias, cerca_carreteras)
+        influenciados = fuente > 0
+        return x[influenciados], y[influenciados], fuente[influenciados]
+
+    def simular_acumulado(self, anos=10, num_puntos_inicial=NUM_PUNTOS_INICIAL, semilla=None, almacen=None):
+        # Simulación de microplasticos.py: 'anos' tandas crecientes sobre el mismo mapa
+        rng = crear_generador(semilla)
+        almacen = AlmacenPuntos() if almacen is None else almacen
+        for i in range(anos):
+            almacen.agregar(ANO_BASE + i, *self.dispersar(self.puntos_por_poligono(num_puntos_inicial, i), rng))
+        return almacen
+
+    def acumular_densidad(self, malla, ano, n_por_poligono, semilla=None, tam_bloque=TAM_BLOQUE):
+        # Genera los puntos por bloques y los suma a la malla sin conservarlos
+        rng = crear_generador(semilla)
+        for inicio in range(0, n_por_poligono, tam_bloque):
+            x, y, fuente = self.dispersar(min(tam_bloque, n_por_poligono - inicio), rng)
+            malla.acumular(ano, x, y, fuente)
+        return malla
+
+    def simular_acumulado_densidad(self, anos=10, num_puntos_inicial=NUM_PUNTOS_INICIAL, semilla=None,
+                                   resolucion=100, tam_bloque=TAM_BLOQUE):
+        # Igual que simular_acumulado, pero con memoria constante sin importar el número de partículas
+        rng = crear_generador(semilla)
+        malla = MallaDensidad.desde_cienegas(self.gdf_cienegas, resolucion)
+        for i in range(anos):
+            self.acumular_densidad(malla, ANO_BASE + i, self.puntos_por_poligono(num_puntos_inicial, i), rng, tam_bloque)
+        return malla
+
+    def puntos_del_ano(self, ano):
+        # Simulación de MicroplasticosTiempo.py: el año base parte de NUM_PUNTOS_BASE por polígono
+        num_puntos_inicial = NUM_PUNTOS_BASE if ano == ANO_BASE else NUM_PUNTOS_INICIAL
+        return self.puntos_por_poligono(num_puntos_inicial, ano - ANO_BASE)
+
+    def simular_ano(self, ano, semilla=None):
+        return self.dispersar(self.puntos_del_ano(ano), semilla_de_ano(semilla, ano))
+
+
+class MotorReduccion:
+    tasa_anual = 0.01  # 1% de reducción anual
+
+    def calcular_factor_reduccion(self, año):
+        return 1 - (1 - self.tasa_anual) ** (año - 2023)
+
+    def reducir_geometria(self, geom, factor, area_total, area_original):
+        if isinstance(geom, Polygon):
+            # Factor de reducción ajustado para áreas pequeñas
+            factor_ajustado = factor * (area_original / geom.area)
+            factor_ajustado = min(factor_ajustado, 0.2)  # Limitar la reducción a un 20% máximo por iteración
+            nueva_geom = geom.buffer(-factor_ajustado * geom.length)
+            if nueva_geom.is_empty or nueva_geom.area <= 0:
+                return None
+            return nueva_geom
+        elif isinstance(geom, MultiPolygon):
+            reduced_polys = [self.reducir_geometria(poly, factor, area_total, area_original) for poly in geom.geoms]
+            return MultiPolygon([poly for poly in reduced_polys if poly is not None])
+        elif isinstance(geom, GeometryCollection):
+            reduced_geoms = [self.reducir_geometria(g, factor, area_total, area_original) for g in geom.geoms]
+            return GeometryCollection([g for g in reduced_geoms if g is not None])
+        else:
+            return geom
+
+    def preparar_reduccion(self, gdf):
+        # Se descompone una sola vez en polígonos simples; área y perímetro se calculan una vez
+        geometrias = np.asarray(gdf.geometry.values, dtype=object)
+        partes, fila = shapely.get_parts(geometrias, return_index=True)
+        self._partes = partes
+        self._fila = fila
+        self._n_filas = len(geometrias)
+        self._es_poligono = shapely.get_type_id(partes) == 3
+        self._areas = shapely.area(partes)
+        self._longitudes = shapely.length(partes)
+        self._area_original = gdf.area.max()  # Máximo área inicial para el ajuste
+        self._area_total = gdf.area.sum()
+
+    def reducir_partes(self, factor):
+        # Versión vectorizada de reducir_geometria: un solo buffer sobre todas las partes
+        reducidas = self._partes.copy()
+        poligonos = self._es_poligono & (self._areas > 0)
+        factor_ajustado = np.minimum(factor * self._area_original / self._areas[poligonos], 0.2)  # 20% máximo por iteración
+        # quad_segs=16 es el valor por omisión de geom.buffer en reducir_geometria (shapely.buffer usa 8)
+        reducidas[poligonos] = shapely.buffer(self._partes[poligonos], -factor_ajustado * self._longitudes[poligonos],
+                                              quad_segs=16)
+
+        vivas = ~shapely.is_empty(reducidas) & (~self._es_poligono | (shapely.area(reducidas) > 0))
+        sub_partes, sub_indice = shapely.get_parts(reducidas[vivas], return_index=True)
+        filas = self._fila[vivas][sub_indice]
+
+        # Reagrupar por fila original; las filas sin partes quedan en None. Solo las filas que tienen alguna
+        # parte que no es polígono pasan a GeometryCollection, como en reducir_geometria
+        geometrias = np.full(self._n_filas, None, dtype=object)
+        filas_mixtas = np.zeros(self._n_filas, dtype=bool)
+        filas_mixtas[filas[shapely.get_type_id(sub_partes) != 3]] = True
+        mixtas = filas_mixtas[filas]
+        if (~mixtas).any():
+            shapely.multipolygons(sub_partes[~mixtas], indices=filas[~mixtas], out=geometrias)
+        if mixtas.any():
+            shapely.geometrycollections(sub_partes[mixtas], indices=filas[mixtas], out=geometrias)
+
+        perdidos = int(np.count_nonzero(self._es_poligono & ~vivas))
+        return geometrias, perdidos
+
+    def iterar_reduccion(self, gdf, anos=10, ano_inicial=2023):
+        # Entrega (GeoDataFrame reducido, métricas del año) año por año, sin conservar los anteriores;
+        # al terminar deja la tabla completa en self.metricas
+        self.preparar_reduccion(gdf)
+        metricas = []
+        for i in range(anos):
+            año_actual = ano_inicial + i
+            geometrias, perdidos = self.reducir_partes(self.calcular_factor_reduccion(año_actual))
+
+            # Filtramos geometrías vacías
+            vivas = ~shapely.is_missing(geometrias)
+            gdf_reducido = gdf.iloc[np.flatnonzero(vivas)].set_geometry(geometrias[vivas], crs=gdf.crs)
+            gdf_reducido['año'] = año_actual
+
+            area = float(shapely.area(geometrias[vivas]).sum())
+            metricas.append({'año': año_actual, 'area': area,
+                             'reduccion_pct': (1 - area / self._area_total) * 100 if self._area_total else 0.0,
+                             'poligonos': int(shapely.get_num_geometries(geometrias[vivas]).sum()),
+                             'poligonos_perdidos': perdidos})
+            yield gdf_reducido, metricas[-1]
+
+        # Tabla por año (área en el CRS de entrada): evita recalcular áreas al visualizar
+        self.metricas = pd.DataFrame(metricas)
+
+    @instrumentacion.medido('reduccion')
+    def simular_reduccion(self, gdf, anos=10, ano_inicial=2023):
+        return [gdf_reducido for gdf_reducido, _ in self.iterar_reduccion(gdf, anos, ano_inicial)]
+
+    @instrumentacion.medido('to_crs')
+    def reproyectar(self, gdf_original, simulaciones, epsg=3857):
+        # Una sola llamada a to_crs para el original y todos los años
+        geometrias = [np.asarray(gdf_original.geometry.values, dtype=object)]
+        geometrias += [np.asarray(gdf.geometry.values, dtype=object) for gdf in simulaciones]
+        todas = gpd.GeoSeries(np.concatenate(geometrias), crs=gdf_original.crs).to_crs(epsg=epsg).values
+
+        cortes = np.cumsum([len(g) for g in geometrias])[:-1]
+        partes = np.split(np.asarray(todas, dtype=object), cortes)
+        original = gdf_original.set_geometry(partes[0], crs=todas.crs)
+        return original, [gdf.set_geometry(g, crs=todas.crs) for gdf, g in zip(simulaciones, partes[1:])]
@@ -0,0 +1,62 @@
+import numpy as np
+import shapely
+
+import instrumentacion
+
+# Tamaño máximo de cada lote de candidatos (acota la memoria en polígonos muy delgados)
+TAM_LOTE_MAXIMO = 2_000_000
+
+
+def crear_generador(semilla=None):
+    # Acepta None, un entero, una secuencia de enteros o un Generator ya creado
+    if isinstance(semilla, np.random.Generator):
+        return semilla
+    return np.random.default_rng(semilla)
+
+
+def muestrear_puntos_en_poligono(poligono, n, rng):
+    xs = np.empty(n, dtype=np.float64)
+    ys = np.empty(n, dtype=np.float64)
+    if n <= 0 or poligono is None or poligono.is_empty:
+        return xs[:0], ys[:0]
+
+    minx, miny, maxx, maxy = poligono.bounds
+    area_bbox = (maxx - minx) * (maxy - miny)
+    if area_bbox <= 0 or poligono.area <= 0:
+        return xs[:0], ys[:0]
+    fraccion = poligono.area / area_bbox  # Probabilidad de que un candidato caiga dentro
+
+    shapely.prepare(poligono)  # Acelera las pruebas de contención repetidas
+
+    llenos = 0
+    while llenos < n:
+        faltan = n - llenos
+        # Sobredimensionamos el lote para que normalmente baste con una sola pasada
+        tam_lote = min(int(faltan / fraccion * 1.2) + 64, TAM_LOTE_MAXIMO)
+        cand_x = rng.uniform(minx, maxx, tam_lote)
+        cand_y = rng.uniform(miny, maxy, tam_lote)
+        dentro = shapely.contains_xy(poligono, cand_x, cand_y)
+        instrumentacion.contar('muestreo.candidatos', tam_lote)
+        instrumentacion.contar('muestreo.lotes')
+        cand_x = cand_x[dentro][:faltan]
+        cand_y = cand_y[dentro][:faltan]
+        xs[llenos:llenos + len(cand_x)] = cand_x
+        ys[llenos:llenos + len(cand_y)] = cand_y
+        llenos += len(cand_x)
+    instrumentacion.contar('muestreo.aceptados', n)
+
+    return xs, ys
+
+
+def muestrear_puntos(geometrias, n_por_poligono, semilla=None):
+    # Genera n_por_poligono puntos dentro de cada polígono y devuelve arreglos de coordenadas
+    rng = crear_generador(semilla)
+    xs, ys = [], []
+    for poligono in np.asarray(geometrias, dtype=object):
+        x, y = muestrear_puntos_en_poligono(poligono, n_por_poligono, rng)
+        xs.append(x)
+        ys.append(y)
+
+    if not xs:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(xs), np.concatenate(ys)
@@ -0,0 +1,108 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+
+FRACCION_PIXEL = 0.5  # Tolerancia máxima en píxeles: por debajo de medio píxel la simplificación no se nota
+PIXELES_VISTA = 1000  # Ancho de referencia de la vista completa para elegir las tolerancias
+NIVELES = 4
+
+
+def simplificar_capa(geometrias, tolerancia):
+    # Las orillas compartidas entre ciénegas vecinas se simplifican una sola vez para toda la capa, así los
+    # vecinos siguen compartiendo el mismo borde y no se abren huecos ni traslapes entre ellos
+    valores = np.asarray(geometrias.values, dtype=object)
+    presentes = ~shapely.is_missing(valores) & ~shapely.is_empty(valores)
+    if not hasattr(shapely, 'coverage_simplify') or not shapely.coverage_is_valid(valores[presentes]):
+        # shapely < 2.1, o polígonos que se enciman y no forman una cobertura: cada geometría por separado
+        return geometrias.simplify(tolerancia, preserve_topology=True)
+    simplificadas = valores.copy()
+    simplificadas[presentes] = shapely.coverage_simplify(valores[presentes], tolerancia)
+    return gpd.GeoSeries(simplificadas, index=geometrias.index, crs=geometrias.crs)
+
+
+def tamano_pixel(ax):
+    # Unidades del mapa por píxel de pantalla con la extensión actual de los ejes
+    x0, x1 = ax.get_xlim()
+    y0, y1 = ax.get_ylim()
+    return max(abs(x1 - x0) / max(ax.bbox.width, 1), abs(y1 - y0) / max(ax.bbox.height, 1))
+
+
+class CacheNivelesDetalle:
+    # Versiones simplificadas de una capa a varias tolerancias, calculadas una vez y reutilizadas en cada redibujo
+    def __init__(self, geometrias, tolerancias=None, niveles=NIVELES):
+        self.original = geometrias
+        if tolerancias is None:
+            minx, miny, maxx, maxy = geometrias.total_bounds
+            lado = max(maxx - minx, maxy - miny, 0)
+            # La más gruesa basta para la vista completa; cada nivel siguiente sirve para un acercamiento x4
+            tolerancias = [FRACCION_PIXEL * lado / PIXELES_VISTA / 4 ** k for k in range(niveles)]
+        self.tolerancias = sorted(t for t in tolerancias if t > 0)
+        self.niveles = [simplificar_capa(geometrias, t) for t in self.tolerancias]
+
+    def nivel(self, tamano_pixel):
+        # Índice del nivel más simplificado que no se distingue a este tamaño de píxel; None = original
+        admitidas = np.flatnonzero(np.asarray(self.tolerancias) <= FRACCION_PIXEL * tamano_pixel)
+        return int(admitidas[-1]) if len(admitidas) else None
+
+    def geometrias(self, tamano_pixel):
+        indice = self.nivel(tamano_pixel)
+        return self.original if indice is None else self.niveles[indice]
+
+    def para_ejes(self, ax):
+        return self.geometrias(tamano_pixel(ax))
+
+
+class CapaNivelDetalle:
+    # Dibuja una capa con el nivel que corresponde a la vista y lo cambia al hacer zoom o desplazar
+    def __init__(self, ax, cache, **estilo):
+        self.ax = ax
+        self.cache = cache
+        self.estilo = estilo
+        self.indice = None
+        self.artistas = []
+        self._dibujando = False
+
+        ajustar_vista = not ax.has_data() and ax.get_autoscale_on()
+        if ajustar_vista:
+            # Ejes vacíos y sin límites fijados: la vista inicial es la extensión de la capa, como al dibujarla con geopandas
+            minx, miny, maxx, maxy = cache.original.total_bounds
+            ax.set_xlim(minx, maxx)
+            ax.set_ylim(miny, maxy)
+            ax.set_autoscale_on(True)
+        self.actualizar(forzar=True, conservar_vista=not ajustar_vista)
+        self._conexiones = [ax.callbacks.connect('xlim_changed', self._al_cambiar_limites),
+                            ax.callbacks.connect('ylim_changed', self._al_cambiar_limites)]
+
+    def actualizar(self, forzar=False, conservar_vista=True):
+        indice = self.cache.nivel(tamano_pixel(self.ax))
+        if indice == self.indice and not forzar:
+            return False
+        self._dibujando = True
+        try:
+            limites = self.ax.axis()
+            self.quitar()
+            n_colecciones = len(self.ax.collections)
+            geometrias = self.cache.original if indice is None else self.cache.niveles[indice]
+            if not geometrias.empty:
+                geometrias.plot(ax=self.ax, **self.estilo)
+            self.artistas = list(self.ax.collections[n_colecciones:])
+            if conservar_vista:
+                self.ax.axis(limites)  # geopandas reajusta la vista al dibujar; se conserva la del usuario
+        finally:
+            self._dibujando = False
+        self.indice = indice
+        return True
+
+    def _al_cambiar_limites(self, ax):
+        if not self._dibujando and self.actualizar():
+            self.ax.figure.canvas.draw_idle()
+
+    def quitar(self):
+        for artista in self.artistas:
+            artista.remove()
+        self.artistas = []
+
+    def desconectar(self):
+        for conexion in self._conexiones:
+            self.ax.callbacks.disconnect(conexion)
+        self._conexiones = []
@@ -0,0 +1,57 @@
+import numpy as np
+import shapely
+
+import instrumentacion
+
+UMBRAL_INDUSTRIAS = 5000  # 5 km de influencia industrial
+UMBRAL_CARRETERAS = 2000  # 2 km de influencia de carreteras
+
+TAM_BLOQUE = 200_000  # Puntos consultados por bloque para acotar la memoria
+
+
+def _geometrias_validas(gdf):
+    geometrias = np.asarray(gdf.geometry.values, dtype=object)
+    validas = ~(shapely.is_missing(geometrias) | shapely.is_empty(geometrias))
+    return geometrias[validas]
+
+
+class MotorProximidad:
+    def __init__(self, gdf_industrias, gdf_carreteras,
+                 umbral_industrias=UMBRAL_INDUSTRIAS, umbral_carreteras=UMBRAL_CARRETERAS):
+        self.umbral_industrias = umbral_industrias
+        self.umbral_carreteras = umbral_carreteras
+
+        # Un índice espacial por capa; se construye una sola vez y se reutiliza en cada lote
+        self.arbol_industrias = shapely.STRtree(_geometrias_validas(gdf_industrias))
+        self.arbol_carreteras = shapely.STRtree(_geometrias_validas(gdf_carreteras))
+
+    def distancias(self, arbol, x, y, max_distancia=None):
+        # Distancia a la entidad más cercana; np.inf si no hay ninguna dentro de max_distancia
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        resultado = np.full(len(x), np.inf)
+        if len(arbol) == 0:
+            return resultado
+
+        instrumentacion.contar('distancias.evaluaciones', len(x))
+        with instrumentacion.fase('distancias'):
+            for inicio in range(0, len(x), TAM_BLOQUE):
+                fin = inicio + TAM_BLOQUE
+                puntos = shapely.points(x[inicio:fin], y[inicio:fin])
+                indices, dist = arbol.query_nearest(puntos, max_distance=max_distancia,
+                                                    return_distance=True, all_matches=False)
+                resultado[inicio + indices[0]] = dist
+
+        return resultado
+
+    def distancias_industrias(self, x, y, max_distancia=None):
+        return self.distancias(self.arbol_industrias, x, y, max_distancia)
+
+    def distancias_carreteras(self, x, y, max_distancia=None):
+        return self.distancias(self.arbol_carreteras, x, y, max_distancia)
+
+    def clasificar(self, x, y):
+        # Devuelve dos máscaras booleanas: cerca de industrias y cerca de carreteras
+        cerca_industrias = self.distancias_industrias(x, y, self.umbral_industrias) < self.umbral_industrias
+        cerca_carreteras = self.distancias_carreteras(x, y, self.umbral_carreteras) < self.umbral_carreteras
+        return cerca_industrias, cerca_carreteras
@@ -0,0 +1,129 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from rasterio import features
+from rasterio.transform import from_origin
+from scipy import ndimage
+from shapely.geometry import shape
+
+import instrumentacion
+from motor_simulacion import MotorReduccion
+
+
+def poligonos_de_mascara(mascara, transform):
+    return [shape(geom) for geom, _ in features.shapes(mascara.astype(np.uint8), mask=mascara, transform=transform)]
+
+
+class FotogramasRaster:
+    # Secuencia perezosa de GeoDataFrames: cada año se vectoriza solo cuando se pide
+    def __init__(self, reduccion, anos, epsg=None):
+        self.reduccion = reduccion
+        self.anos = list(anos)
+        self.epsg = epsg
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.anos)
+
+    def __getitem__(self, i):
+        if i not in self._cache:
+            gdf = self.reduccion.vectorizar(self.anos[i])
+            self._cache[i] = gdf.to_crs(epsg=self.epsg) if self.epsg is not None else gdf
+        return self._cache[i]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def reproyectadas(self, epsg):
+        return FotogramasRaster(self.reduccion, self.anos, epsg)
+
+    def mascara(self, i):
+        # Lo barato de cada año; vectorizarla es lo costoso y lo hace quien la recibe (p. ej. animacion_offline)
+        return self.reduccion.mascara_ano(self.anos[i])
+
+    def parametros_vectorizacion(self):
+        # (transformada, CRS de la máscara, EPSG de salida) para convertir máscaras con poligonos_de_mascara
+        return self.reduccion.transform, self.reduccion.crs, self.epsg
+
+
+class ReduccionRaster(MotorReduccion):
+    def __init__(self, resolucion=10):
+        self.resolucion = resolucion  # Tamaño de celda en unidades del CRS de entrada (metros)
+
+    def rasterizar(self, gdf):
+        minx, miny, maxx, maxy = gdf.total_bounds
+        margen = 2 * self.resolucion  # Borde de celdas vacías para que la erosión actúe en los extremos
+        self.columnas = int(np.ceil((maxx - minx + 2 * margen) / self.resolucion))
+        self.filas = int(np.ceil((maxy - miny + 2 * margen) / self.resolucion))
+        self.transform = from_origin(minx - margen, maxy + margen, self.resolucion, self.resolucion)
+        self.crs = gdf.crs
+        # Cada celda guarda el índice (desde 1) del polígono simple que la cubre; 0 es tierra
+        self.partes = shapely.get_parts(np.asarray(gdf.geometry.values, dtype=object))
+        validas = [(p, i + 1) for i, p in enumerate(self.partes) if not p.is_empty]
+        if not validas:
+            return np.zeros((self.filas, self.columnas), dtype=np.int32)
+        return features.rasterize(validas, out_shape=(self.filas, self.columnas), transform=self.transform,
+                                  fill=0, dtype='int32')
+
+    def preparar(self, gdf):
+        # Todo lo costoso se hace una vez: rasterizar las partes y la transformada de distancia
+        self.etiquetas = self.rasterizar(gdf)
+        self.mascara = self.etiquetas > 0
+        self.n_componentes = len(self.partes)
+
+        # Área y perímetro de cada parte salen de la geometría vectorial, como en reducir_geometria;
+        # contar celdas de borde subestima el perímetro en ~10% sin importar la resolución
+        self.areas = np.zeros(self.n_componentes + 1)
+        self.longitudes = np.zeros(self.n_componentes + 1)
+        poligonos = shapely.get_type_id(self.partes) == 3
+        self.areas[1:][poligonos] = shapely.area(self.partes[poligonos])
+        self.longitudes[1:][poligonos] = shapely.length(self.partes[poligonos])
+        self.celdas_iniciales = np.bincount(self.etiquetas.ravel(), minlength=self.n_componentes + 1)
+
+        # Distancia de cada celda de agua a la orilla: erosionar con un disco de radio r es quedarse con distancia > r.
+        # Las partes que se tocan se erosionan como un solo cuerpo de agua.
+        self.distancia = ndimage.distance_transform_edt(self.mascara) * self.resolucion
+        self._area_original = gdf.area.max()  # Máximo área inicial para el ajuste
+        self._area_total = self.celdas_iniciales[1:].sum() * self.resolucion ** 2
+
+    def radios(self, factor):
+        # Mismo criterio que reducir_geometria, por polígono simple
+        radios = np.zeros(self.n_componentes + 1)
+        con_area = self.areas > 0
+        factor_ajustado = np.minimum(factor * self._area_original / self.areas[con_area], 0.2)
+        radios[con_area] = factor_ajustado * self.longitudes[con_area]
+        return radios
+
+    def mascara_ano(self, ano):
+        # Costo fijo por año: una comparación sobre el arreglo, sin importar la complejidad de la orilla
+        return self.distancia > self.radios(self.calcular_factor_reduccion(ano))[self.etiquetas]
+
+    def vectorizar(self, ano):
+        poligonos = poligonos_de_mascara(self.mascara_ano(ano), self.transform)
+        gdf = gpd.GeoDataFrame({'año': [ano] * len(poligonos)}, geometry=poligonos, crs=self.crs)
+        return gdf
+
+    def metricas_ano(self, ano, mascara):
+        restantes = np.bincount(self.etiquetas[mascara], minlength=self.n_componentes + 1)[1:]
+        area = float(mascara.sum()) * self.resolucion ** 2
+        return {'año': ano, 'area': area,
+                'reduccion_pct': (1 - area / self._area_total) * 100 if self._area_total else 0.0,
+                'poligonos': int(np.count_nonzero(restantes)),
+                'poligonos_perdidos': int(np.count_nonzero((restantes == 0) & (self.celdas_iniciales[1:] > 0)))}
+
+    def iterar_reduccion(self, gdf, anos=10, ano_inicial=2023):
+        # Como MotorReduccion.iterar_reduccion: cada año se vectoriza, se entrega y se descarta
+        self.preparar(gdf)
+        metricas = []
+        for ano in range(ano_inicial, ano_inicial + anos):
+            metricas.append(self.metricas_ano(ano, self.mascara_ano(ano)))
+            yield self.vectorizar(ano), metricas[-1]
+        self.metricas = pd.DataFrame(metricas)
+
+    @instrumentacion.medido('reduccion')
+    def simular_reduccion(self, gdf, anos=10, ano_inicial=2023):
+        self.preparar(gdf)
+        lista_anos = [ano_inicial + i for i in range(anos)]
+        self.metricas = pd.DataFrame([self.metricas_ano(ano, self.mascara_ano(ano)) for ano in lista_anos])
+        return FotogramasRaster(self, lista_anos)
@@ -0,0 +1,23 @@
+import threading
+
+# Sin dependencias pesadas: el menú puede crear la sesión antes de importar geopandas
+
+
+class SesionDatos:
+    # Capas y motores compartidos por todas las ventanas de la aplicación; cada uno se carga una sola vez
+    def __init__(self):
+        self._objetos = {}
+        self._candado = threading.RLock()
+
+    def obtener(self, clave, cargador):
+        with self._candado:
+            if clave not in self._objetos:
+                self._objetos[clave] = cargador()
+            return self._objetos[clave]
+
+    def olvidar(self, clave=None):
+        with self._candado:
+            if clave is None:
+                self._objetos.clear()
+            else:
+                self._objetos.pop(clave, None)
@@ -0,0 +1,207 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from almacen_puntos import AlmacenPuntos, contar_puntos
+from capas import agregar_argumentos_datos, cargar_cienegas, rutas_de_argumentos
+import instrumentacion
+from ensamble import ejecutar_ensamble
+from exportador import ExportadorPoligonos, ExportadorPuntos
+from densidad import MallaDensidad
+from transporte import MARGEN_TRANSPORTE, MotorTransporte
+from motor_simulacion import ANO_BASE, MotorMicroplasticos, MotorReduccion, cargar_capas, semilla_de_ano
+
+# Ejecuta las simulaciones sin Tkinter, p. ej.:
+#   python simular.py reduccion --desde 2023 --hasta 2032 --salida resultados
+#   python simular.py tiempo --datos /datos/cienegas --salida resultados
+#   python simular.py tiempo --desde 2023 --hasta 2027 --semilla 7 --salida resultados
+#   python simular.py tiempo --replicas 64 --semilla 7 --salida resultados
+#   python simular.py microplasticos --formato parquet --salida resultados
+#   python simular.py reduccion --animacion resultados/reduccion.mp4
+
+
+def guardar_puntos(ruta, x, y, fuente):
+    # fuente: 1 = industria, 2 = carretera, 3 = ambas
+    np.savetxt(ruta, np.column_stack([x, y, fuente]), delimiter=',', header='x,y,fuente', comments='',
+               fmt=['%.3f', '%.3f', '%d'])
+
+
+def ejecutar_reduccion(args):
+    gdf_original = cargar_cienegas(rutas_de_argumentos(args)[2], epsg=None)
+    if args.backend == 'raster':
+        from reduccion_raster import ReduccionRaster  # Requiere scipy; el backend vectorial no
+        motor = ReduccionRaster(args.resolucion_raster)
+    else:
+        motor = MotorReduccion()
+    exportador = None
+    if args.formato != 'csv':
+        exportador = ExportadorPoligonos(os.path.join(args.salida, f"reduccion.{args.formato}"), gdf_original.crs,
+                                         gdf_original.total_bounds)
+    fotogramas = [] if args.animacion else None  # Solo la animación necesita conservar todos los años
+
+    # Cada año se escribe en cuanto se calcula y se descarta; en memoria solo está el año en curso
+    for gdf_reducido, metricas in motor.iterar_reduccion(gdf_original, args.hasta - args.desde + 1, args.desde):
+        ano = metricas['año']
+        if exportador is not None:
+            exportador.escribir_gdf(ano, gdf_reducido)
+        elif not gdf_reducido.empty:
+            gdf_reducido.to_file(os.path.join(args.salida, f"reduccion_{ano}.geojson"), driver='GeoJSON')
+        if fotogramas is not None:
+            fotogramas.append(gdf_reducido.to_crs(epsg=3857))
+        print(f"Año {ano}: reducción {metricas['reduccion_pct']:.2f}%")
+    if exportador is not None:
+        exportador.cerrar()
+
+    if args.animacion:
+        from animacion_offline import exportar_reduccion  # matplotlib, contextily y PIL solo para la animación
+        exportar_reduccion(gdf_original.to_crs(epsg=3857), fotogramas, motor.metricas['reduccion_pct'].to_numpy(),
+                           args.animacion, args.desde, args.fps, args.procesos)
+        print(f"Animación guardada en {args.animacion}")
+
+    motor.metricas.to_csv(os.path.join(args.salida, "reduccion_resumen.csv"), index=False)
+
+
+def puntos_del_ano(args, motor, ano, en_el_tiempo):
+    if en_el_tiempo:
+        return motor.puntos_del_ano(ano)  # Misma regla del año base que la ventana de MicroplasticosTiempo.py
+    # Como microplasticos.py: el crecimiento cuenta desde el primer año de la corrida
+    return motor.puntos_por_poligono(args.puntos, ano - args.desde)
+
+
+def ejecutar_densidad_ano(args, motor, ano, en_el_tiempo, resumen):
+    # Modo densidad: solo se guarda la malla del año, nunca los puntos
+    malla = MallaDensidad.desde_cienegas(motor.gdf_cienegas, args.densidad)
+    motor.acumular_densidad(malla, ano, puntos_del_ano(args, motor, ano, en_el_tiempo), semilla_de_ano(args.semilla, ano))
+    np.savez_compressed(os.path.join(args.salida, f"densidad_{ano}.npz"), malla=malla.mallas.get(ano, np.zeros(malla.forma)),
+                        bordes_x=malla.bordes_x, bordes_y=malla.bordes_y)
+    resumen.append({'año': ano, 'puntos': malla.conteo()})
+    print(f"Año {ano}: {resumen[-1]['puntos']} puntos acumulados en la malla.")
+
+
+def ejecutar_microplasticos(args, en_el_tiempo):
+    gdf_industrias, gdf_carreteras, gdf_cienegas = cargar_capas(*rutas_de_argumentos(args))
+    motor = MotorMicroplasticos(gdf_cienegas, gdf_industrias, gdf_carreteras,
+                                args.modo_distancias, args.resolucion_campos)
+
+    exportador = None
+    if args.formato != 'csv' and not args.densidad:
+        # Cada año se escribe en cuanto se genera; en memoria solo está el año en curso
+        exportador = ExportadorPuntos(os.path.join(args.salida, f"microplasticos.{args.formato}"), gdf_cienegas.crs,
+                                      gdf_cienegas.total_bounds)
+
+    almacen = AlmacenPuntos() if args.animacion and not args.densidad else None
+
+    resumen = []
+    for ano in range(args.desde, args.hasta + 1):
+        if args.densidad:
+            ejecutar_densidad_ano(args, motor, ano, en_el_tiempo, resumen)
+            continue
+        x, y, fuente = motor.dispersar(puntos_del_ano(args, motor, ano, en_el_tiempo), semilla_de_ano(args.semilla, ano))
+        if exportador is not None:
+            exportador.escribir_puntos(ano, x, y, fuente)
+        else:
+            guardar_puntos(os.path.join(args.salida, f"microplasticos_{ano}.csv"), x, y, fuente)
+        if almacen is not None:
+            almacen.agregar(ano, x, y, fuente)
+        resumen.append({'año': ano, 'puntos': contar_puntos(fuente)})
+        print(f"Año {ano}: {resumen[-1]['puntos']} puntos generados.")
+    if exportador is not None:
+        exportador.cerrar()
+    if almacen is not None:
+        from animacion_offline import exportar_microplasticos  # matplotlib, contextily y PIL solo para la animación
+        exportar_microplasticos(gdf_cienegas, almacen, args.animacion, args.fps, args.procesos)
+        print(f"Animación guardada en {args.animacion}")
+
+    pd.DataFrame(resumen).to_csv(os.path.join(args.salida, "microplasticos_resumen.csv"), index=False)
+
+
+def ejecutar_transporte(args):
+    # Las fuentes se recortan con el margen de la malla, no con los umbrales de influencia del modelo de puntos
+    gdf_industrias, gdf_carreteras, gdf_cienegas = cargar_capas(*rutas_de_argumentos(args),
+                                                                margen_industrias=MARGEN_TRANSPORTE,
+                                                                margen_carreteras=MARGEN_TRANSPORTE)
+    transporte = MotorTransporte(gdf_cienegas, gdf_industrias, gdf_carreteras, resolucion=args.resolucion_transporte)
+
+    resumen = []
+    for ano in range(ANO_BASE, args.hasta + 1):
+        deposito = transporte.simular_hasta(ano)
+        if ano < args.desde:
+            continue  # El estado se arrastra desde el año base aunque no se guarde
+        np.savez_compressed(os.path.join(args.salida, f"transporte_{ano}.npz"), deposito=deposito,
+                            mascara=transporte.mascara, extension=np.asarray(transporte.extension))
+        resumen.append({'año': ano, 'deposito_total': float(deposito.sum())})
+        print(f"Año {ano}: depósito total {resumen[-1]['deposito_total']:.1f}")
+
+    pd.DataFrame(resumen).to_csv(os.path.join(args.salida, "transporte_resumen.csv"), index=False)
+
+
+def ejecutar_ensamble_tiempo(args):
+    gdf_industrias, gdf_carreteras, gdf_cienegas = cargar_capas(*rutas_de_argumentos(args))
+    resultado = ejecutar_ensamble(gdf_industrias, gdf_carreteras, gdf_cienegas, args.replicas,
+                                  range(args.desde, args.hasta + 1), args.semilla, args.resolucion_malla,
+                                  args.procesos, args.modo_distancias, args.resolucion_campos)
+    resultado.guardar(args.salida)
+    print(resultado.tabla_conteos().to_string(index=False))
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Simulaciones de las Ciénegas de Lerma sin interfaz gráfica")
+    parser.add_argument('simulacion', choices=['reduccion', 'microplasticos', 'tiempo', 'transporte'])
+    parser.add_argument('--desde', type=int, default=ANO_BASE, help="Primer año simulado")
+    parser.add_argument('--hasta', type=int, default=None, help="Último año simulado (incluido)")
+    parser.add_argument('--salida', default='resultados', help="Directorio de resultados")
+    agregar_argumentos_datos(parser)
+    parser.add_argument('--semilla', type=int, default=None, help="Semilla para resultados reproducibles")
+    parser.add_argument('--puntos', type=int, default=1000, help="Puntos iniciales por polígono (microplasticos)")
+    parser.add_argument('--modo-distancias', choices=['exacto', 'raster'], default='exacto')
+    parser.add_argument('--resolucion-campos', type=float, default=50, help="Celda en metros del modo raster")
+    parser.add_argument('--perfil', default=None, metavar='RUTA',
+                        help="Guarda tiempos, contadores y memoria pico por fase (JSON, o Chrome trace si termina en .trace.json)")
+    parser.add_argument('--animacion', default=None, metavar='RUTA',
+                        help="Renderiza los años en paralelo a un .mp4, un .gif o un directorio de PNG")
+    parser.add_argument('--fps', type=float, default=1, help="Años por segundo de la animación")
+    parser.add_argument('--formato', choices=['csv', 'parquet', 'fgb'], default='csv',
+                        help="Salida de puntos y polígonos: CSV/GeoJSON por año, GeoParquet o FlatGeobuf")
+    parser.add_argument('--densidad', type=float, default=None, metavar='CELDA',
+                        help="Acumula una malla de densidad con celdas de CELDA metros en lugar de guardar los puntos")
+    parser.add_argument('--backend', choices=['vectorial', 'raster'], default='vectorial',
+                        help="Reducción por buffer negativo o por erosión sobre un ráster (reduccion)")
+    parser.add_argument('--resolucion-raster', type=float, default=10, help="Celda en metros del backend raster")
+    parser.add_argument('--resolucion-transporte', type=float, default=100, help="Celda en metros del modelo de transporte")
+    parser.add_argument('--replicas', type=int, default=1, help="Réplicas Monte Carlo en paralelo (tiempo)")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos del ensamble y de la animación (por defecto, todos los núcleos)")
+    parser.add_argument('--resolucion-malla', type=float, default=250, help="Celda en metros de las mallas del ensamble")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.hasta is None:
+        # Mismos horizontes que las ventanas: 10 años para reducción y microplásticos, hasta 2027 en el tiempo
+        args.hasta = 2027 if args.simulacion in ('tiempo', 'transporte') else args.desde + 9
+    if args.hasta < args.desde:
+        print("Error: --hasta debe ser mayor o igual que --desde", file=sys.stderr)
+        return 2
+    os.makedirs(args.salida, exist_ok=True)
+    if args.perfil:
+        instrumentacion.activar(args.perfil)
+
+    try:
+        if args.simulacion == 'reduccion':
+            ejecutar_reduccion(args)
+        elif args.simulacion == 'transporte':
+            ejecutar_transporte(args)
+        elif args.simulacion == 'tiempo' and args.replicas > 1:
+            ejecutar_ensamble_tiempo(args)
+        else:
+            ejecutar_microplasticos(args, en_el_tiempo=args.simulacion == 'tiempo')
+    finally:
+        instrumentacion.desactivar()  # También una corrida fallida deja su perfil
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+import shapely
+from shapely.geometry import GeometryCollection, LineString, MultiPolygon, Polygon, box
+
+from motor_simulacion import MotorReduccion
+
+FACTORES = [0.0, 0.01, 0.05, 0.2, 0.5]
+
+
+def cienegas():
+    # Polígono grande, multipolígono con una parte diminuta, forma en L y polígono con hueco
+    ele = Polygon([(0, 0), (400, 0), (400, 100), (100, 100), (100, 400), (0, 400)])
+    con_hueco = Polygon(box(0, 0, 500, 500).exterior.coords, [box(200, 200, 300, 300).exterior.coords])
+    geometrias = [box(0, 0, 1000, 1000),
+                  MultiPolygon([box(2000, 0, 2600, 600), box(3000, 0, 3010, 10)]),
+                  shapely.affinity.translate(ele, 5000, 0),
+                  shapely.affinity.translate(con_hueco, 7000, 0)]
+    return gpd.GeoDataFrame({'nombre': ['cuadro', 'multi', 'ele', 'hueco']}, geometry=geometrias, crs=3857)
+
+
+def referencia(motor, gdf, factor):
+    # reducir_geometria parte por parte: área de cada fila y polígonos que desaparecen
+    area_original = gdf.area.max()
+    areas, perdidos = [], 0
+    for geom in gdf.geometry:
+        partes = [motor.reducir_geometria(p, factor, 0, area_original) for p in getattr(geom, 'geoms', [geom])]
+        perdidos += sum(p is None for p in partes)
+        areas.append(sum(p.area for p in partes if p is not None))
+    return np.asarray(areas), perdidos
+
+
+@pytest.mark.parametrize("factor", FACTORES)
+def test_reducir_partes_coincide_con_reducir_geometria(factor):
+    motor = MotorReduccion()
+    gdf = cienegas()
+    motor.preparar_reduccion(gdf)
+    geometrias, perdidos = motor.reducir_partes(factor)
+
+    areas_esperadas, perdidos_esperados = referencia(motor, gdf, factor)
+    areas = np.array([0.0 if g is None else g.area for g in geometrias])
+    np.testing.assert_allclose(areas, areas_esperadas, rtol=1e-9, atol=1e-6)
+    assert perdidos == perdidos_esperados
+
+
+def test_fila_mixta_no_convierte_las_demas():
+    motor = MotorReduccion()
+    gdf = gpd.GeoDataFrame(geometry=[MultiPolygon([box(0, 0, 100, 100)]),
+                                     GeometryCollection([box(500, 0, 600, 100), LineString([(700, 0), (800, 0)])])],
+                           crs=3857)
+    motor.preparar_reduccion(gdf)
+    geometrias, _ = motor.reducir_partes(0.01)
+    assert geometrias[0].geom_type == 'MultiPolygon'
+    assert geometrias[1].geom_type == 'GeometryCollection'
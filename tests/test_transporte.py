@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("rasterio")
+from shapely.geometry import LineString, Point, box
+
+from transporte import MotorTransporte
+
+
+def capas_caja():
+    # Ciénega cuadrada de 3 km con una industria y una carretera cerca
+    cienegas = gpd.GeoDataFrame(geometry=[box(0, 0, 3000, 3000)], crs=3857)
+    industrias = gpd.GeoDataFrame(geometry=[Point(-1000, 1500)], crs=3857)
+    carreteras = gpd.GeoDataFrame(geometry=[LineString([(-500, -500), (3500, -500)])], crs=3857)
+    return cienegas, industrias, carreteras
+
+
+@pytest.mark.parametrize("velocidad", [(0.0, 0.0), (2000.0, 0.0), (1e4, 0.0), (-5000.0, 3000.0)])
+def test_deposito_finito_y_no_negativo_con_adveccion(velocidad):
+    motor = MotorTransporte(*capas_caja(), resolucion=100, difusividad=2.5e5, velocidad=velocidad, margen=2000)
+    for deposito in (motor.simular_hasta(ano) for ano in range(2023, 2033)):
+        assert np.all(np.isfinite(deposito))
+        assert deposito.min() >= 0
+    assert np.all(np.isfinite(motor.concentracion))
+    assert motor.concentracion.min() >= 0
+
+
+def test_paso_cumple_condicion_de_adveccion():
+    motor = MotorTransporte(*capas_caja(), resolucion=100, difusividad=2.5e5, velocidad=(1e4, 2000.0), margen=2000)
+    dt = motor.paso_tiempo()
+    assert dt * 12000.0 / motor.resolucion <= 1
+    assert dt * motor.tasa_sedimentacion <= 1
+
+
+def test_subpasos_no_dependen_de_la_resolucion_sin_adveccion():
+    # La difusión implícita no limita el paso: 10 m y 100 m usan los mismos subpasos
+    gruesa = MotorTransporte(*capas_caja(), resolucion=100, difusividad=2.5e5, margen=500)
+    fina = MotorTransporte(*capas_caja(), resolucion=10, difusividad=2.5e5, margen=500)
+    assert fina.paso_tiempo() == gruesa.paso_tiempo()
+
+
+def test_difusion_implicita_conserva_masa():
+    motor = MotorTransporte(*capas_caja(), resolucion=100, difusividad=2.5e5, tasa_sedimentacion=0.0, margen=500)
+    motor.concentracion[motor.filas // 2, motor.columnas // 2] = 1000.0
+    motor._paso(np.float32(0.5), np.zeros_like(motor.concentracion))
+    assert motor.concentracion.min() >= 0
+    assert motor.concentracion.sum() == pytest.approx(1000.0, rel=1e-5)
+    assert motor.concentracion.max() < 1000.0
+
+
+def test_deposito_en_float64():
+    motor = MotorTransporte(*capas_caja(), resolucion=100, margen=500)
+    assert motor.simular_hasta(2024).dtype == np.float64
@@ -0,0 +1,149 @@
+import numpy as np
+from rasterio import features
+from rasterio.transform import from_origin
+
+from motor_simulacion import ANO_BASE, TASA_INCREMENTO
+from proximidad import UMBRAL_INDUSTRIAS
+
+MARGEN_TRANSPORTE = UMBRAL_INDUSTRIAS  # La malla cubre las ciénegas más este margen en metros
+
+
+def _vecinos(c):
+    # Borde sin flujo: se replica la celda del borde
+    p = np.pad(c, 1, mode='edge')
+    return p[:-2, 1:-1], p[2:, 1:-1], p[1:-1, :-2], p[1:-1, 2:]  # norte, sur, oeste, este
+
+
+def _factorizar_difusion(n, a):
+    # Eliminación de Thomas para (1 + 2a) x_i - a (x_i-1 + x_i+1) = b_i, con borde sin flujo (diagonal 1 + a en
+    # los extremos). La matriz no cambia entre pasos: se factoriza una vez y solo se sustituye en cada paso
+    diagonal = np.full(n, 1 + 2 * a)
+    diagonal[0] -= a
+    diagonal[-1] -= a
+    superior = np.empty(n)
+    pivotes = np.empty(n)
+    pivotes[0] = diagonal[0]
+    superior[0] = -a / pivotes[0]
+    for i in range(1, n):
+        pivotes[i] = diagonal[i] + a * superior[i - 1]
+        superior[i] = -a / pivotes[i]
+    return a, superior, pivotes
+
+
+def _resolver_difusion(b, factores):
+    # Resuelve a lo largo del eje 0 todas las columnas de b a la vez
+    a, superior, pivotes = factores
+    x = np.array(b, dtype=np.float64, order='C')  # Filas contiguas: cada paso del barrido lee una fila
+    x[0] /= pivotes[0]
+    for i in range(1, len(x)):
+        x[i] += a * x[i - 1]
+        x[i] /= pivotes[i]
+    for i in range(len(x) - 2, -1, -1):
+        x[i] -= superior[i] * x[i + 1]
+    return x
+
+
+class MotorTransporte:
+    # Modelo de advección-difusión sobre una malla; unidades en metros y años
+    def __init__(self, gdf_cienegas, gdf_industrias, gdf_carreteras, resolucion=100,
+                 difusividad=2.5e5, velocidad=(0.0, 0.0), tasa_sedimentacion=2.0,
+                 emision_industrias=1.0, emision_carreteras=0.2, tasa_incremento=TASA_INCREMENTO,
+                 margen=MARGEN_TRANSPORTE):
+        self.resolucion = float(resolucion)
+        self.difusividad = difusividad  # m²/año
+        self.velocidad = velocidad  # (u, v) en m/año, positivo hacia el este y el norte
+        self.tasa_sedimentacion = tasa_sedimentacion  # Fracción por año que se deposita
+        self.tasa_incremento = tasa_incremento
+
+        # La malla cubre las ciénegas más el radio de influencia, para incluir las fuentes cercanas.
+        # Las capas de fuentes deben cargarse recortadas con al menos este margen o faltarán emisiones en el borde.
+        self.margen = margen
+        minx, miny, maxx, maxy = gdf_cienegas.total_bounds
+        minx, miny, maxx, maxy = minx - margen, miny - margen, maxx + margen, maxy + margen
+        self.columnas = int(np.ceil((maxx - minx) / self.resolucion))
+        self.filas = int(np.ceil((maxy - miny) / self.resolucion))
+        self.transform = from_origin(minx, maxy, self.resolucion, self.resolucion)
+        self.extension = (minx, minx + self.columnas * self.resolucion, maxy - self.filas * self.resolucion, maxy)
+
+        self.mascara = self._rasterizar(gdf_cienegas.geometry, all_touched=False) > 0
+        self._peso_mascara = self.mascara.astype(np.float32)
+        self.fuentes = (emision_industrias * self._rasterizar(gdf_industrias.geometry, all_touched=True)
+                        + emision_carreteras * self._rasterizar(gdf_carreteras.geometry, all_touched=True))
+
+        self.concentracion = np.zeros((self.filas, self.columnas), dtype=np.float32)
+        # float64: cada subpaso suma un incremento muy pequeño y en float32 se perdería frente al total
+        self.deposito = np.zeros((self.filas, self.columnas), dtype=np.float64)
+        self._factores = None  # (dt, factores por columnas, factores por filas) de la difusión implícita
+        self.ano = ANO_BASE - 1  # Último año simulado
+        self.depositos = {}  # año -> depósito acumulado en las ciénegas
+
+    def _rasterizar(self, geometrias, all_touched):
+        # merge_alg 'add': varias entidades en la misma celda suman su emisión
+        validas = [(g, 1) for g in geometrias if g is not None and not g.is_empty]
+        if not validas:
+            return np.zeros((self.filas, self.columnas), dtype=np.float32)
+        return features.rasterize(validas, out_shape=(self.filas, self.columnas), transform=self.transform,
+                                  fill=0, all_touched=all_touched, merge_alg=features.MergeAlg.add,
+                                  dtype='float32')
+
+    def paso_tiempo(self):
+        # La difusión es implícita y no limita el paso, así que el número de subpasos no crece con 1/dx².
+        # Solo la advección contra corriente es explícita: dt * (|u| + |v|) / dx <= 1, y la sedimentación dt * k <= 1
+        limites = [1.0]
+        tasa = (abs(self.velocidad[0]) + abs(self.velocidad[1])) / self.resolucion
+        if tasa > 0:
+            limites.append(0.9 / tasa)
+        if self.tasa_sedimentacion > 0:
+            limites.append(0.9 / self.tasa_sedimentacion)
+        return min(limites)
+
+    def _difundir(self, c, dt):
+        # Euler implícito separado por ejes: una solución tridiagonal por columnas y otra por filas.
+        # Cada una es estable con cualquier dt, conserva la masa y no produce concentraciones negativas
+        if self._factores is None or self._factores[0] != dt:
+            a = self.difusividad * dt / self.resolucion ** 2
+            self._factores = (dt, _factorizar_difusion(self.filas, a), _factorizar_difusion(self.columnas, a))
+        _, por_columnas, por_filas = self._factores
+        c = _resolver_difusion(c, por_columnas)
+        return _resolver_difusion(c.T, por_filas).T
+
+    def _paso(self, dt, emision):
+        c = self.concentracion
+        u, v = self.velocidad
+        if u or v:
+            norte, sur, oeste, este = _vecinos(c)
+            cambio = np.zeros_like(c)
+            if u:
+                cambio -= u * ((c - oeste) if u > 0 else (este - c)) / self.resolucion
+            if v:
+                # La fila 0 es el norte: con v > 0 la masa llega desde la celda del sur
+                cambio -= v * ((c - sur) if v > 0 else (norte - c)) / self.resolucion
+            c += dt * cambio
+
+        c += dt * emision
+        if self.difusividad > 0:
+            c[:] = self._difundir(c, dt)
+        sedimentado = (dt * self.tasa_sedimentacion) * c
+        c -= sedimentado
+        sedimentado *= self._peso_mascara  # Solo se acumula lo que cae en las ciénegas
+        self.deposito += sedimentado
+
+    def avanzar_ano(self):
+        self.ano += 1
+        emision = (self.fuentes * self.tasa_incremento ** (self.ano - ANO_BASE)).astype(np.float32)
+        n_pasos = int(np.ceil(1.0 / self.paso_tiempo()))
+        dt = np.float32(1.0 / n_pasos)
+        for _ in range(n_pasos):
+            self._paso(dt, emision)
+        self.depositos[self.ano] = self.deposito.copy()
+        return self.depositos[self.ano]
+
+    def simular_hasta(self, ano):
+        while self.ano < ano:
+            self.avanzar_ano()
+        return self.depositos[ano]
+
+    def dibujar(self, ax, deposito, cmap='viridis', alpha=0.8, **kwargs):
+        malla = np.ma.masked_where(~self.mascara | (deposito <= 0), deposito)
+        return ax.imshow(malla, extent=self.extension, origin='upper', cmap=cmap, alpha=alpha,
+                         interpolation='nearest', zorder=2, **kwargs)